@@ -0,0 +1,165 @@
+import os
+import base64
+import hashlib
+import threading
+import importlib.util
+from collections import OrderedDict
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QSize
+from PyQt6.QtGui import QImage, QImageReader
+
+# 读取内嵌封面需要 mutagen; 没装时只使用同目录图片. 在加载线程里第一次用到时才导入
+HAVE_MUTAGEN = importlib.util.find_spec("mutagen") is not None
+
+# --- 封面解析 ---
+THUMB_SIZE = 320
+THUMB_DIR = "thumbs"
+FOLDER_COVERS = ('cover.jpg', 'cover.png', 'folder.jpg', 'folder.png')
+# 空 QImage 表示"确认没有封面", 与"还没查过"(None) 区分开
+NO_ART = QImage()
+
+def track_sidecar(path):
+    base = os.path.splitext(path)[0]
+    for ext in ('.jpg', '.png'):
+        if os.path.exists(base + ext): return base + ext
+    return None
+
+def folder_sidecar(path):
+    d = os.path.dirname(path)
+    for n in FOLDER_COVERS:
+        p = os.path.join(d, n)
+        if os.path.exists(p): return p
+    return None
+
+def pick_picture(pictures):
+    # 优先 front cover (type 3), 否则取第一张
+    pictures = list(pictures)
+    for pic in pictures:
+        if getattr(pic, 'type', None) == 3: return pic.data
+    return pictures[0].data if pictures else None
+
+def embedded_art(path):
+    # ID3 APIC (mp3/aiff/wav), FLAC PICTURE, MP4 covr, Ogg/Opus METADATA_BLOCK_PICTURE, APE Cover Art
+    if not HAVE_MUTAGEN: return None
+    import mutagen
+    try: f = mutagen.File(path); tags = f.tags if f is not None else None
+    except Exception: f = None; tags = None
+    if getattr(f, 'pictures', None): return pick_picture(f.pictures)
+    if tags is None:
+        # 音频帧损坏但 ID3 标签完好的文件, 单独读一次标签
+        try:
+            from mutagen.id3 import ID3
+            tags = ID3(path)
+        except Exception: return None
+    try:
+        if hasattr(tags, 'getall'):
+            data = pick_picture(tags.getall('APIC') or tags.getall('PIC'))
+            if data: return data
+        if 'covr' in tags and tags['covr']: return bytes(tags['covr'][0])
+        if 'metadata_block_picture' in tags:
+            from mutagen.flac import Picture
+            return pick_picture(Picture(base64.b64decode(v)) for v in tags['metadata_block_picture'])
+        for k in ('Cover Art (Front)', 'Cover Art (front)'):
+            if k in tags:
+                # APE: "文件名\0图片数据"
+                raw = tags[k].value; return raw.split(b'\0', 1)[1] if b'\0' in raw else raw
+    except Exception: return None
+    return None
+
+def decode_thumb(path=None, data=None, size=THUMB_SIZE):
+    # 解码时直接缩放到短边 size (JPEG 可在解码阶段降采样), 不先解出整张大图
+    buf = None
+    if data is not None:
+        buf = QBuffer(); buf.setData(QByteArray(data)); buf.open(QIODevice.OpenModeFlag.ReadOnly)
+        reader = QImageReader(buf)
+    else: reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    s = reader.size()
+    if s.isValid() and min(s.width(), s.height()) > size:
+        k = size / min(s.width(), s.height())
+        reader.setScaledSize(QSize(max(1, round(s.width() * k)), max(1, round(s.height() * k))))
+    img = reader.read()
+    return NO_ART if img.isNull() else img
+
+# --- 封面缓存 ---
+# 内存: 按字节数限制的 LRU; 磁盘: thumbs/ 下的 320px 缩略图 (空文件表示没有封面).
+# 同名图片/目录封面按图片本身做键, 同一专辑的歌共用一份; 内嵌封面按歌曲文件做键.
+class ArtworkCache:
+    def __init__(self, thumb_dir=THUMB_DIR, max_bytes=64 << 20):
+        self.thumb_dir = thumb_dir; self.max_bytes = max_bytes; self.bytes = 0
+        self.images = OrderedDict(); self.tracks = {}; self.lock = threading.Lock()
+
+    def peek(self, track_path):
+        # 不做磁盘 I/O; 未知返回 None, 确认无封面返回 NO_ART
+        with self.lock:
+            t = self.tracks.get(track_path)
+            if t is None or t[1] not in self.images: return None
+            self.images.move_to_end(t[1]); return self.images[t[1]]
+
+    def load(self, track_path):
+        try: mtime = os.stat(track_path).st_mtime_ns
+        except OSError: return NO_ART
+        with self.lock:
+            t = self.tracks.get(track_path)
+            if t is not None and t[0] == mtime and t[1] in self.images:
+                self.images.move_to_end(t[1]); return self.images[t[1]]
+        # 顺序: 同名图片 > 内嵌封面 > cover/folder 图片
+        key, img = self.from_file(track_sidecar(track_path))
+        if img is NO_ART:
+            key, img = self.cached(f"embed|{track_path}|{mtime}", lambda: self.decode_embedded(track_path))
+            if img is NO_ART:
+                k2, img2 = self.from_file(folder_sidecar(track_path))
+                if k2: key, img = k2, img2
+        with self.lock: self.tracks[track_path] = (mtime, key)
+        return img
+
+    def invalidate(self, track_path):
+        # 同目录图片增删后重新查找; 解码结果按图片 mtime 做键, 不必清除
+        with self.lock: self.tracks.pop(track_path, None)
+
+    def decode_embedded(self, track_path):
+        data = embedded_art(track_path)
+        return decode_thumb(data=data) if data else NO_ART
+
+    def from_file(self, image_path):
+        if not image_path: return None, NO_ART
+        try: mtime = os.stat(image_path).st_mtime_ns
+        except OSError: return None, NO_ART
+        return self.cached(f"file|{image_path}|{mtime}", lambda: decode_thumb(path=image_path))
+
+    def cached(self, key, produce):
+        with self.lock:
+            img = self.images.get(key)
+            if img is not None: self.images.move_to_end(key); return key, img
+        img = self.read_thumb(key)
+        if img is None: img = produce(); self.write_thumb(key, img)
+        self.remember(key, img)
+        return key, img
+
+    def remember(self, key, img):
+        with self.lock:
+            old = self.images.pop(key, None)
+            if old is not None: self.bytes -= old.sizeInBytes()
+            self.images[key] = img; self.bytes += img.sizeInBytes()
+            while self.bytes > self.max_bytes and len(self.images) > 1:
+                _, dropped = self.images.popitem(last=False); self.bytes -= dropped.sizeInBytes()
+
+    def thumb_path(self, key):
+        return os.path.join(self.thumb_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".jpg")
+
+    def read_thumb(self, key):
+        p = self.thumb_path(key)
+        try:
+            if os.path.getsize(p) == 0: return NO_ART
+        except OSError: return None
+        img = QImage(p)
+        return None if img.isNull() else img
+
+    def write_thumb(self, key, img):
+        p = self.thumb_path(key); tmp = p + ".tmp"
+        try:
+            os.makedirs(self.thumb_dir, exist_ok=True)
+            if img.isNull(): open(tmp, 'wb').close()
+            elif not img.save(tmp, "JPG", 90): return
+            os.replace(tmp, p)
+        except OSError: pass
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+# 无界面运行: 必须在导入 Qt 之前设置
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# --- 测试曲库生成 ---
+def make_lrc_text(lines, seed=0, compressed=False):
+    # compressed: 每 8 行一句 "副歌" 带两个时间标签 (第二个晚于后面的行), 即压缩格式
+    rnd = random.Random(seed); t = 0; out = ["[ti:Bench]", "[ar:MusePlayer]"]
+    stamp = lambda ms: f"[{ms//60000:02}:{(ms%60000)/1000:05.2f}]"
+    for i in range(lines):
+        t += rnd.randint(1500, 6000)
+        again = stamp(t + 60000) if compressed and i % 8 == 0 else ""
+        out.append(f"{stamp(t)}{again}第 {i+1} 句歌词 line {i+1} la la la")
+    return "\n".join(out) + "\n"
+
+def make_fixture(root, tracks, lrc_ratio=0.5, tracks_per_album=12, albums_per_artist=5, seed=0):
+    # 目录结构: root/Artist NNN/Album NN/NN Track.ext, 音频文件为空文件, 部分带同名 .lrc
+    rnd = random.Random(seed); exts = ('.mp3', '.flac', '.m4a', '.ogg')
+    made = 0; a = 0
+    while made < tracks:
+        for b in range(albums_per_artist):
+            d = os.path.join(root, f"Artist {a:03}", f"Album {b:02}"); os.makedirs(d, exist_ok=True)
+            for n in range(tracks_per_album):
+                if made >= tracks: break
+                base = os.path.join(d, f"{n+1:02} Track {made}")
+                open(base + rnd.choice(exts), 'wb').close()
+                if rnd.random() < lrc_ratio:
+                    with open(base + ".lrc", 'w', encoding='utf-8') as f: f.write(make_lrc_text(rnd.randint(20, 80), made))
+                made += 1
+            if made >= tracks: break
+        a += 1
+    return made
+
+# --- 计时 ---
+def measure(fn, repeat=20, warmup=2):
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); samples.append((time.perf_counter() - t) * 1000)
+    return summarize(samples)
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {"unit": "ms", "n": len(samples), "mean": statistics.fmean(samples), "median": statistics.median(samples),
+            "p95": samples[min(len(samples)-1, int(len(samples) * 0.95))], "min": samples[0]}
+
+# --- 各项测试 ---
+def bench_scan(main, sizes, repeat):
+    results = {}
+    for n in sizes:
+        root = tempfile.mkdtemp(prefix="scan_", dir=".")
+        make_fixture(root, n, lrc_ratio=0)
+        totals = []; firsts = []
+        for _ in range(max(1, repeat // 4)):
+            # 全新扫描: 删掉索引, 记录首批结果到达时间和总耗时
+            if os.path.exists(main.LIBRARY_DB): os.remove(main.LIBRARY_DB)
+            sc = main.LibraryScanner(root); first = []; t = time.perf_counter()
+            sc.batch_found.connect(lambda b: first or first.append((time.perf_counter() - t) * 1000))
+            sc.run(); totals.append((time.perf_counter() - t) * 1000); firsts.append(first[0] if first else totals[-1])
+        results[f"scan.full.{n}"] = summarize(totals); results[f"scan.first_batch.{n}"] = summarize(firsts)
+        results[f"scan.revalidate.{n}"] = measure(lambda: main.LibraryScanner(root, revalidate=True).run(), repeat, 1)
+    return results
+
+def bench_lrc(main, repeat):
+    import lrc
+    results = {}
+    for lines in (50, 200, 1000):
+        text = make_lrc_text(lines)
+        for enc in ('utf-8', 'gbk'):
+            p = f"bench_{lines}_{enc}.lrc"
+            with open(p, 'w', encoding=enc) as f: f.write(text)
+            results[f"lrc.read.{enc}.{lines}"] = measure(lambda: lrc.read_lrc(p), repeat)
+        pc = f"bench_{lines}_compressed.lrc"
+        with open(pc, 'w', encoding='utf-8') as f: f.write(make_lrc_text(lines, compressed=True))
+        # 压缩格式是合法的, 不能被报告为乱序
+        tl = lrc.read_lrc(pc); assert not tl.unsorted and not tl.errors, f"压缩格式歌词被误报: 乱序 {tl.unsorted[:5]} 错误 {tl.errors[:5]}"
+        results[f"lrc.read.compressed.{lines}"] = measure(lambda: lrc.read_lrc(pc), repeat)
+        cache = lrc.LyricCache(); cache.load(p)
+        results[f"lrc.cache_hit.{lines}"] = measure(lambda: cache.load(p), repeat)
+    return results
+
+def bench_lookup(win, repeat):
+    import lrc
+    win.lyrics = lrc.parse_lrc(make_lrc_text(80)); win.is_maker_active = False
+    end = win.lyrics.times[-1] + 5000
+    def playback():
+        # 以 16ms 一次的 positionChanged 播放完整首歌
+        win.lrc_line = -1
+        for pos in range(0, end, 16): win.update_ui_progress(pos)
+    r = measure(playback, max(1, repeat // 4), 1); ticks = len(range(0, end, 16))
+    per_tick = {k: (v / ticks if k in ("mean", "median", "p95", "min") else v) for k, v in r.items()}
+    return {"lookup.update_ui_progress.per_tick": per_tick, "lookup.update_ui_progress.song": r}
+
+def bench_paint(main, repeat):
+    from PyQt6.QtGui import QImage, QPixmap, QColor
+    results = {}
+    vinyl = main.VinylRecord()
+    cover = QPixmap(3000, 3000); cover.fill(QColor(180, 60, 90)); vinyl.set_cover(cover)
+    img = QImage(vinyl.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    def frame():
+        vinyl.angle = (vinyl.angle + 0.5) % 360; img.fill(0); vinyl.render(img)
+    vinyl.render(img)
+    results["paint.vinyl.frame"] = measure(frame, repeat * 5)
+    results["paint.vinyl.set_cover"] = measure(lambda: (vinyl.set_cover(cover), vinyl.render(img)), repeat)
+    for low in (False, True):
+        bg = main.DynamicBackground(); bg.resize(1150, 780); bg.configure(low_power=low)
+        canvas = QImage(bg.size(), QImage.Format.Format_ARGB32_Premultiplied); bg.render(canvas)
+        results[f"paint.background.{'low_power' if low else 'default'}.frame"] = measure(lambda: (bg.update_anim(30), bg.render(canvas)), repeat * 5)
+    return results
+
+def bench_maker(main, win, repeat):
+    from PyQt6.QtGui import QKeyEvent
+    from PyQt6.QtCore import QEvent, Qt
+    results = {}; win.ensure_maker_page()
+    space = QKeyEvent(QEvent.Type.KeyPress, Qt.Key.Key_Space, Qt.KeyboardModifier.NoModifier)
+    for lines in (50, 100, 250, 500):
+        text = "\n".join(("[Chorus]" if i % 8 == 0 else f"第 {i} 句 歌词 lyric line {i}") for i in range(lines))
+        def start():
+            win.btn_rec.setChecked(False); win.is_maker_active = False
+            win.txt_maker.setPlainText(text); win.btn_rec.setChecked(True); win.toggle_record()
+        start()
+        results[f"maker.render_maker_html.{lines}"] = measure(win.render_maker_html, repeat)
+        def keypress():
+            if win.maker_step >= len(win.playable_indices) - 1: win.maker_step = 0; win.maker_timestamps = []; win.render_maker_html()
+            win.keyPressEvent(space); win.flush_maker_update()
+        results[f"maker.keypress.{lines}"] = measure(keypress, repeat * 2)
+    win.btn_rec.setChecked(False); win.toggle_record()
+    return results
+
+def bench_search(sizes, repeat):
+    from search import SearchIndex, tokenize
+    rnd = random.Random(0); results = {}
+    words = "love night city dream fire heart rain song blue light star moon road home time".split(); cjk = "夜空中最亮的星城市梦想火焰雨歌"
+    for n in sizes:
+        names = [" ".join(rnd.choice(words) + str(rnd.randint(0, 99)) for _ in range(3)) + " " + "".join(rnd.sample(cjk, 4)) for _ in range(n)]
+        idx = SearchIndex(); t = time.perf_counter()
+        for i, name in enumerate(names): idx.set(f"/m/{i}.mp3", 'name', tokenize(name))
+        results[f"search.build.{n}"] = summarize([(time.perf_counter() - t) * 1000])
+        for q in ("lo", "love1", "night3 fire", "最亮"):
+            results[f"search.query.{q.replace(' ', '_')}.{n}"] = measure(lambda: idx.search(q), repeat)
+        results[f"search.update.{n}"] = measure(lambda: idx.set("/m/0.mp3", 'lrc', tokenize(rnd.choice(names))), repeat)
+    return results
+
+def bench_queue(sizes, repeat):
+    # 每项操作重复 1000 次计时 (ms / 1000 次), 大小不同结果应基本不变
+    from playqueue import PlayQueue
+    rnd = random.Random(0); results = {}
+    def times(fn, k=1000):
+        def run():
+            for _ in range(k): fn()
+        return run
+    for n in sizes:
+        q = PlayQueue(); q.extend_to(n); q.jump(0); t = time.perf_counter(); q.set_shuffle(True)
+        results[f"queue.shuffle_first.{n}"] = summarize([(time.perf_counter() - t) * 1000])
+        results[f"queue.next.{n}"] = measure(times(q.next), repeat)
+        results[f"queue.prev.{n}"] = measure(times(q.prev), repeat)
+        results[f"queue.jump.{n}"] = measure(times(lambda: q.jump(rnd.randrange(n))), repeat)
+        results[f"queue.play_next.{n}"] = measure(times(lambda: q.play_next([rnd.randrange(n)])), repeat)
+        results[f"queue.reshuffle.{n}"] = measure(times(lambda: q.set_shuffle(True)), repeat)
+        order = list(range(n)); rnd.shuffle(order)
+        results[f"queue.reorder.{n}"] = measure(lambda: q.reorder(order), max(1, repeat // 4), 1)
+    return results
+
+def bench_startup(repeat, folder=None):
+    # 每次启动一个新进程 (MUSE_STARTUP=exit), 读取它打印的各阶段时间 (从进程内第一行代码算起, ms)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    env = dict(os.environ, MUSE_STARTUP="exit", MUSE_SINGLE_INSTANCE="0"); marks = {}
+    if folder:
+        with open("settings.json", 'w', encoding='utf-8') as f: json.dump({"last_folder": os.path.abspath(folder)}, f)
+    for _ in range(max(1, repeat // 4)):
+        t = time.perf_counter()
+        out = subprocess.run([sys.executable, script], env=env, capture_output=True, text=True, timeout=120).stdout.strip().splitlines()
+        wall = (time.perf_counter() - t) * 1000
+        if not out: print("startup: main.py 没有输出启动时间 (多媒体后端不可用?)", file=sys.stderr); return {}
+        for k, v in json.loads(out[-1]).items(): marks.setdefault(k, []).append(v)
+        marks.setdefault("startup.process_wall", []).append(wall)
+    return {k: summarize(v) for k, v in marks.items()}
+
+# --- 结果比较 ---
+def compare(old_path, new, threshold):
+    with open(old_path, 'r', encoding='utf-8') as f: old = json.load(f)["results"]
+    worse = 0
+    print(f"{'benchmark':45} {'old':>10} {'new':>10} {'ratio':>7}")
+    for k, v in sorted(new["results"].items()):
+        if k not in old: continue
+        a, b = old[k]["median"], v["median"]; ratio = b / a if a else float('inf')
+        flag = " !" if ratio > threshold else ""
+        if flag: worse += 1
+        print(f"{k:45} {a:10.3f} {b:10.3f} {ratio:7.2f}{flag}")
+    return worse
+
+CASES = ("scan", "lrc", "lookup", "paint", "maker", "search", "queue", "startup")
+
+def main_cli(argv=None):
+    ap = argparse.ArgumentParser(description="MusePlayer 性能基准 (无界面, 输出 JSON)")
+    ap.add_argument("--out", help="结果 JSON 文件 (默认输出到 stdout)")
+    ap.add_argument("--only", default=",".join(CASES), help=f"逗号分隔: {','.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--scan-sizes", default="1000,10000")
+    ap.add_argument("--search-sizes", default="10000,100000")
+    ap.add_argument("--queue-sizes", default="10000,100000")
+    ap.add_argument("--startup-folder", help="startup 测试时作为上次打开的文件夹 (测含曲库加载的启动时间)")
+    ap.add_argument("--compare", help="与之前的结果 JSON 比较 (按中位数)")
+    ap.add_argument("--threshold", type=float, default=1.25, help="比较时超过该倍数视为退化, 退出码为退化项数")
+    ap.add_argument("--make-fixture", metavar="DIR", help="只生成测试曲库到 DIR 后退出")
+    ap.add_argument("--tracks", type=int, default=1000, help="--make-fixture 的曲目数")
+    ap.add_argument("--lrc-ratio", type=float, default=0.5, help="--make-fixture 中带歌词的比例")
+    args = ap.parse_args(argv)
+
+    if args.make_fixture:
+        n = make_fixture(args.make_fixture, args.tracks, args.lrc_ratio)
+        print(f"created {n} tracks in {args.make_fixture}"); return 0
+
+    out_path = os.path.abspath(args.out) if args.out else None
+    cmp_path = os.path.abspath(args.compare) if args.compare else None
+    startup_folder = os.path.abspath(args.startup_folder) if args.startup_folder else None
+    here = os.path.dirname(os.path.abspath(__file__)); sys.path.insert(0, here)
+    # 在临时目录里运行, 不碰用户的 settings.json / library.db / thumbs
+    work = tempfile.TemporaryDirectory(prefix="muse_bench_"); os.chdir(work.name)
+
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QT_VERSION_STR
+    app = QApplication.instance() or QApplication(sys.argv)
+    import main
+    sys.excepthook = sys.__excepthook__
+    win = main.ModernPlayer() if set(args.only.split(",")) & {"lookup", "maker"} else None
+    if win is not None: win.finish_startup()
+
+    results = {}; only = args.only.split(",")
+    if "scan" in only: results.update(bench_scan(main, [int(x) for x in args.scan_sizes.split(",") if x], args.repeat))
+    if "lrc" in only: results.update(bench_lrc(main, args.repeat))
+    if "lookup" in only: results.update(bench_lookup(win, args.repeat))
+    if "paint" in only: results.update(bench_paint(main, args.repeat))
+    if "maker" in only: results.update(bench_maker(main, win, args.repeat))
+    if "search" in only: results.update(bench_search([int(x) for x in args.search_sizes.split(",") if x], args.repeat))
+    if "queue" in only: results.update(bench_queue([int(x) for x in args.queue_sizes.split(",") if x], args.repeat))
+    if "startup" in only: results.update(bench_startup(args.repeat, startup_folder))
+
+    report = {"meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "qt": QT_VERSION_STR,
+                       "platform": platform.platform(), "numpy": main.np is not None, "repeat": args.repeat},
+              "results": results}
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if out_path:
+        with open(out_path, 'w', encoding='utf-8') as f: f.write(text)
+    else: print(text)
+    if win is not None: win.close()
+    os.chdir(here)
+    if cmp_path: return compare(cmp_path, report, args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
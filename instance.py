@@ -0,0 +1,72 @@
+import os
+import json
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# --- 单实例 ---
+# 第一个启动的进程监听本地套接字; 之后的启动 (如文件管理器 "打开方式") 只把参数转交过去就退出.
+# 消息为一行 JSON: {"paths": [...], "commands": [...]}; 这个模块只依赖 QtCore / QtNetwork, 转交时不必加载界面.
+# MUSE_SINGLE_INSTANCE=0 时关闭 (允许多开)
+SERVER_NAME = "MusePlayer-" + (os.environ.get("USER") or os.environ.get("USERNAME") or "user")
+CONNECT_MS = 300; WRITE_MS = 1000
+COMMANDS = {"--toggle": "toggle", "--play-pause": "toggle", "--play": "play", "--pause": "pause",
+            "--next": "next", "--prev": "prev", "--show": "show"}
+# 带参数值的 Qt 选项 (-style fusion 等): 后面那一项是选项的值, 不是要打开的文件
+QT_VALUE_OPTIONS = {"platform", "platformpluginpath", "platformtheme", "plugin", "qwindowgeometry", "qwindowicon", "qwindowtitle",
+                    "style", "stylesheet", "session", "display", "geometry", "title", "name", "font", "fontengine"}
+
+def enabled(): return os.environ.get("MUSE_SINGLE_INSTANCE", "1") not in ("", "0")
+
+def parse_args(argv):
+    # 文件 / 文件夹转成绝对路径 (运行中的实例工作目录不同); 不认识的 -选项 留给 Qt
+    paths = []; commands = []; skip = False
+    for a in argv:
+        if skip: skip = False
+        elif a in COMMANDS: commands.append(COMMANDS[a])
+        elif a.startswith("-"): skip = a.lstrip("-") in QT_VALUE_OPTIONS
+        else: paths.append(os.path.abspath(a))
+    return {"paths": paths, "commands": commands}
+
+def forward(argv):
+    # 有实例在运行时把参数发过去并返回 True; 没有参数时让它把窗口提到前台
+    msg = parse_args(argv)
+    if not msg["paths"] and not msg["commands"]: msg["commands"].append("show")
+    sock = QLocalSocket(); sock.connectToServer(SERVER_NAME)
+    if not sock.waitForConnected(CONNECT_MS): return False
+    sock.write((json.dumps(msg, ensure_ascii=False) + "\n").encode('utf-8'))
+    ok = sock.waitForBytesWritten(WRITE_MS)
+    sock.disconnectFromServer()
+    if sock.state() != QLocalSocket.LocalSocketState.UnconnectedState: sock.waitForDisconnected(WRITE_MS)
+    return ok
+
+class InstanceServer(QObject):
+    received = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self); self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_connection)
+
+    def listen(self):
+        # 先确认没有别的实例在监听 (Unix 上 listen 会直接替换已有的套接字文件), 再清掉异常退出留下的文件
+        probe = QLocalSocket(); probe.connectToServer(SERVER_NAME)
+        if probe.waitForConnected(CONNECT_MS): probe.disconnectFromServer(); return False
+        QLocalServer.removeServer(SERVER_NAME)
+        return self.server.listen(SERVER_NAME)
+
+    def close(self): self.server.close()
+
+    def on_connection(self):
+        while self.server.hasPendingConnections():
+            sock = self.server.nextPendingConnection(); sock.buf = b""
+            sock.readyRead.connect(lambda s=sock: self.on_ready(s))
+            sock.disconnected.connect(lambda s=sock: self.on_ready(s)); sock.disconnected.connect(sock.deleteLater)
+
+    def on_ready(self, sock):
+        sock.buf += bytes(sock.readAll())
+        while b"\n" in sock.buf:
+            line, sock.buf = sock.buf.split(b"\n", 1)
+            try: msg = json.loads(line.decode('utf-8'))
+            except ValueError: continue
+            if isinstance(msg, dict): self.received.emit({"paths": list(msg.get("paths", ())), "commands": list(msg.get("commands", ()))})
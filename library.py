@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import importlib.util
+from array import array
+
+# 读取标签/时长需要 mutagen; 没装时列表只显示文件名.
+# 导入约 20ms, 放到第一次读标签时 (后台线程里) 再做, 不占启动时间
+HAVE_TAGS = importlib.util.find_spec("mutagen") is not None
+
+# 扫描时收录的音频格式 (界面与命令行的歌词批处理共用)
+SUPPORTED_FORMATS = (
+    '.mp3', '.flac', '.wav', '.ogg', '.m4a', '.wma', 
+    '.aac', '.ape', '.opus', '.alac', '.aiff', '.mp2'
+)
+
+# --- 曲库索引 (SQLite) ---
+# 记录每首歌的 路径/大小/修改时间/显示名, 以及每个目录的 mtime.
+# 启动时直接从这里填充播放列表, 后台校验时只重新列出 mtime 变化过的目录.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, parent TEXT, mtime INTEGER, seq INTEGER);
+CREATE TABLE IF NOT EXISTS tracks (path TEXT PRIMARY KEY, dir TEXT, size INTEGER, mtime INTEGER, name TEXT, seq INTEGER);
+CREATE INDEX IF NOT EXISTS tracks_seq ON tracks(seq);
+CREATE TABLE IF NOT EXISTS tags (path TEXT PRIMARY KEY, mtime INTEGER, title TEXT, artist TEXT, album TEXT, track INTEGER, duration INTEGER);
+"""
+
+class LibraryIndex:
+    # sqlite 连接不能跨线程使用, 每个线程各自创建实例
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, timeout=10)
+        self.conn.executescript(SCHEMA)
+
+    def close(self): self.conn.close()
+
+    def root(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key='root'").fetchone()
+        return row[0] if row else None
+
+    def tracks(self):
+        return self.conn.execute("SELECT path, name FROM tracks ORDER BY seq").fetchall()
+
+    def snapshot(self):
+        # 返回 ({目录: mtime}, {父目录: [子目录]}, {目录: [(路径, 显示名, 大小, mtime)]})
+        dirs = {}; children = {}; files = {}
+        for path, parent, mtime in self.conn.execute("SELECT path, parent, mtime FROM dirs ORDER BY seq"):
+            dirs[path] = mtime; children.setdefault(parent, []).append(path)
+        for path, d, size, mtime, name in self.conn.execute("SELECT path, dir, size, mtime, name FROM tracks ORDER BY seq"):
+            files.setdefault(d, []).append((path, name, size, mtime))
+        return dirs, children, files
+
+    def tags(self):
+        # {路径: (标题, 艺人, 专辑, 音轨号, 时长ms)}
+        return {r[0]: r[1:] for r in self.conn.execute("SELECT path, title, artist, album, track, duration FROM tags")}
+
+    def tag_mtimes(self):
+        return dict(self.conn.execute("SELECT path, mtime FROM tags"))
+
+    def save_tags(self, rows):
+        # rows: [(路径, mtime, 标题, 艺人, 专辑, 音轨号, 时长ms)]
+        with self.conn: self.conn.executemany("INSERT OR REPLACE INTO tags VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def replace(self, root, dirs, tracks):
+        # dirs: [(路径, 父目录, mtime)], tracks: [(路径, 目录, 大小, mtime, 显示名)], 均按播放列表顺序
+        with self.conn:
+            self.conn.execute("DELETE FROM dirs"); self.conn.execute("DELETE FROM tracks")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (root,))
+            self.conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                                  ((p, par, m, i) for i, (p, par, m) in enumerate(dirs)))
+            self.conn.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?)",
+                                  ((p, d, sz, m, n, i) for i, (p, d, sz, m, n) in enumerate(tracks)))
+            # 已不在曲库里的文件, 标签一并清掉
+            self.conn.execute("DELETE FROM tags WHERE path NOT IN (SELECT path FROM tracks)")
+
+
+# --- 标签 / 时长 ---
+NO_TAGS = ("", "", "", 0, 0)
+
+def first_tag(tags, key):
+    v = tags.get(key) if tags else None
+    return str(v[0]).strip() if v else ""
+
+def read_tags(path):
+    # 只解析文件头, 不解码音频; 返回 (标题, 艺人, 专辑, 音轨号, 时长ms), 读不到时标题为空
+    if not HAVE_TAGS: return NO_TAGS
+    import mutagen
+    try: f = mutagen.File(path, easy=True)
+    except Exception: f = None
+    if f is None: return NO_TAGS
+    tags = f.tags if hasattr(f.tags, 'get') else None
+    num = first_tag(tags, 'tracknumber').split('/')[0]
+    length = getattr(f.info, 'length', 0) or 0
+    return (first_tag(tags, 'title'), first_tag(tags, 'artist') or first_tag(tags, 'albumartist'), first_tag(tags, 'album'),
+            int(num) if num.isdigit() else 0, int(length * 1000))
+
+
+# --- 紧凑曲目存储 ---
+# 目录前缀只存一份, 每首歌只记 目录编号(array) + 文件名; 显示名按需生成
+class TrackStore:
+    def __init__(self, paths=()):
+        self.clear(); self.extend(paths)
+
+    def clear(self):
+        self.dirs = []; self.dir_ids = {}; self.dir_of = array('I'); self.files = []
+        # added: 加入顺序, 排序后用来恢复默认顺序; rows: 路径 -> 行号, 第一次查找时才建立
+        self.added = array('I'); self.next_seq = 0; self.rows = None
+
+    def __len__(self): return len(self.files)
+
+    def __getitem__(self, i):
+        return self.dirs[self.dir_of[i]] + self.files[i]
+
+    def __iter__(self):
+        dirs = self.dirs
+        for k, f in zip(self.dir_of, self.files): yield dirs[k] + f
+
+    def split(self, p):
+        # 返回 (目录编号, 文件名); 保留原分隔符, 拼回去的路径与输入完全一致
+        cut = max(p.rfind('/'), p.rfind('\\')) + 1; d = p[:cut]
+        k = self.dir_ids.get(d)
+        if k is None: k = self.dir_ids[d] = len(self.dirs); self.dirs.append(d)
+        return k, p[cut:]
+
+    def extend(self, paths):
+        dirs = self.dirs; ids = self.dir_ids; dir_of = self.dir_of; files = self.files
+        for p in paths:
+            # 与 split() 相同, 内联以加快大批量追加
+            cut = max(p.rfind('/'), p.rfind('\\')) + 1; d = p[:cut]
+            k = ids.get(d)
+            if k is None: k = ids[d] = len(dirs); dirs.append(d)
+            dir_of.append(k); files.append(p[cut:])
+        if self.rows is not None:
+            for i in range(len(self.added), len(files)): self.rows.setdefault(self[i], i)
+        n = len(files) - len(self.added)
+        self.added.extend(range(self.next_seq, self.next_seq + n)); self.next_seq += n
+
+    def reorder(self, order):
+        # order[新位置] = 旧位置
+        self.dir_of = array('I', (self.dir_of[i] for i in order))
+        self.files = [self.files[i] for i in order]
+        self.added = array('I', (self.added[i] for i in order)); self.rows = None
+
+    def delete(self, a, b):
+        del self.dir_of[a:b]; del self.files[a:b]; del self.added[a:b]; self.rows = None
+
+    def replace(self, i, path):
+        # 原位替换 (重命名), 行号和加入顺序不变
+        old = self[i]; self.dir_of[i], self.files[i] = self.split(path)
+        if self.rows is not None:
+            if self.rows.get(old) == i: del self.rows[old]
+            self.rows.setdefault(path, i)
+
+    def rows_in_dirs(self, dirs):
+        # 位于这些目录 (不含子目录) 中的行号
+        ks = {self.dir_ids.get(d.rstrip('/\\') + sep) for d in dirs for sep in ('/', '\\')}; ks.discard(None)
+        return [i for i, k in enumerate(self.dir_of) if k in ks]
+
+    def row_map(self):
+        if self.rows is None:
+            rows = self.rows = {}
+            for i, p in enumerate(self): rows.setdefault(p, i)
+        return self.rows
+
+    def index_of(self, path): return self.row_map().get(path, -1)
+
+    def name(self, i): return os.path.splitext(self.files[i])[0]
@@ -0,0 +1,133 @@
+import os
+import re
+import codecs
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+# --- 歌词时间轴 ---
+# 有序的毫秒时间 (array) + 对应文本, 按位置二分查找;
+# 记住上一次命中的行, 正常向前播放时只需比较相邻一两行, 均摊 O(1)
+class LyricTimeline:
+    def __init__(self, times=(), texts=()):
+        self.times = array('q', times); self.texts = list(texts); self.cursor = -1
+        # 解析附带的信息: 标签 ([ti:] [ar:] [offset:] ...), 无法解析的行, 时间比上一行早的行号, 源编码
+        self.tags = {}; self.errors = []; self.unsorted = []; self.encoding = None
+
+    @classmethod
+    def from_map(cls, lyrics_map):
+        times = sorted(lyrics_map)
+        return cls(times, [lyrics_map[t] for t in times])
+
+    def __len__(self): return len(self.times)
+
+    def index_at(self, pos):
+        # 返回时间 <= pos 的最后一行, 还没到第一行时返回 -1
+        t = self.times; n = len(t); i = self.cursor
+        if (i == -1 and (n == 0 or t[0] > pos)) or (0 <= i < n and t[i] <= pos):
+            if i + 1 >= n or t[i + 1] > pos: return i
+            if i + 2 >= n or t[i + 2] > pos: self.cursor = i + 1; return i + 1
+        self.cursor = bisect_right(t, pos) - 1
+        return self.cursor
+
+    def text(self, i): return self.texts[i] if 0 <= i < len(self.texts) else ""
+
+# --- LRC 解析 ---
+# 支持一行多个时间标签 [00:12.00][01:30.00]text, [mm:ss] / [mm:ss.xx] / [mm:ss.xxx] / [mm:ss:xx], 以及 [offset:±ms]
+TIME_TAG = re.compile(r'\[(\d+):(\d{1,2}(?:[.:]\d+)?)\]')
+INFO_TAG = re.compile(r'^\[([A-Za-z#]+):(.*)\]$')
+
+def decode_lrc(data):
+    # 一次读入后在内存中判断编码: BOM 优先, 否则 UTF-8, 失败再回退 GB18030 (GBK 的超集)
+    # 带 BOM 但内容损坏时同样按无 BOM 的流程回退, 不把有损解码的结果当作干净的文件
+    if data.startswith(codecs.BOM_UTF8):
+        try: return data[3:].decode('utf-8'), 'utf-8-sig'
+        except UnicodeDecodeError: data = data[3:]
+    elif data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        try: return data.decode('utf-16'), 'utf-16'
+        except UnicodeDecodeError: return data.decode('utf-16', 'replace'), 'unknown'
+    try: return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError: pass
+    try: return data.decode('gb18030'), 'gb18030'
+    except UnicodeDecodeError: return data.decode('utf-8', 'replace'), 'unknown'   # 有损, 不应写回
+
+def split_stamps(line):
+    # 行首连续的时间标签 -> ([毫秒, ...], 正文起始位置)
+    pos = 0; stamps = []
+    while True:
+        m = TIME_TAG.match(line, pos)
+        if not m: return stamps, pos
+        mm, ss = m.groups()
+        stamps.append(int(round((int(mm) * 60 + float(ss.replace(':', '.'))) * 1000))); pos = m.end()
+
+def format_time(ms, precise=False):
+    # 与歌词工坊保存的格式一致: [mm:ss.xx]; precise 时保留毫秒 [mm:ss.xxx]
+    if precise: ms = int(ms); return f"[{ms//60000:02}:{ms%60000/1000:06.3f}]"
+    cs = (int(ms) + 5) // 10
+    return f"[{cs//6000:02}:{cs%6000/100:05.2f}]"
+
+def parse_lrc(text):
+    lines = {}; tags = {}; errors = []; unsorted = []; last = -1
+    for no, raw in enumerate(text.splitlines(), 1):
+        l = raw.strip()
+        if not l: continue
+        stamps, pos = split_stamps(l)
+        if stamps:
+            content = l[pos:].strip()
+            # 压缩格式 [00:10][01:30]副歌 的后几个标签本来就晚于下一行, 只比较每行最早的时间
+            first = min(stamps)
+            if first < last: unsorted.append(no)
+            last = first
+            for ms in stamps: lines[ms] = content
+            continue
+        m = INFO_TAG.match(l)
+        if m: tags[m.group(1).lower()] = m.group(2).strip()
+        else: errors.append((no, raw))
+    # [offset:+500] 表示歌词整体提前 500ms
+    try: offset = int(tags.get('offset', '0'))
+    except ValueError: offset = 0; errors.append((0, f"[offset:{tags['offset']}]"))
+    if offset:
+        shifted = {}
+        for ms, content in lines.items(): shifted[max(0, ms - offset)] = content
+        lines = shifted
+    tl = LyricTimeline.from_map(lines)
+    tl.tags = tags; tl.errors = errors; tl.unsorted = unsorted
+    return tl
+
+def read_lrc(path):
+    with open(path, 'rb') as f: data = f.read()
+    text, enc = decode_lrc(data)
+    tl = parse_lrc(text); tl.encoding = enc
+    return tl
+
+# --- 解析结果缓存 ---
+# 以 路径 + mtime 为键的 LRU, 线程安全, 供后台预取使用; 不存在的文件也缓存为空时间轴
+class LyricCache:
+    def __init__(self, capacity=64):
+        self.capacity = capacity; self.entries = OrderedDict(); self.lock = threading.Lock()
+
+    def peek(self, path):
+        # 不做任何磁盘 I/O, 未缓存时返回 None
+        with self.lock:
+            e = self.entries.get(path)
+            if e is None: return None
+            self.entries.move_to_end(path); return e[1]
+
+    def load(self, path):
+        try: mtime = os.stat(path).st_mtime_ns
+        except OSError: mtime = None
+        with self.lock:
+            e = self.entries.get(path)
+            if e is not None and e[0] == mtime: self.entries.move_to_end(path); return e[1]
+        tl = LyricTimeline()
+        if mtime is not None:
+            try: tl = read_lrc(path)
+            except OSError: pass
+        with self.lock:
+            self.entries[path] = (mtime, tl); self.entries.move_to_end(path)
+            while len(self.entries) > self.capacity: self.entries.popitem(last=False)
+        return tl
+
+    def invalidate(self, path):
+        with self.lock: self.entries.pop(path, None)
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from lrc import decode_lrc, parse_lrc, split_stamps, format_time, TIME_TAG
+from library import SUPPORTED_FORMATS
+
+# --- 歌词批处理 (无界面) ---
+# python lrctool.py [选项] 文件夹/文件...   或   python main.py --lrc-tool [选项] ...
+# 转成 UTF-8 后播放时不必再走编码回退; 解析与保存格式都复用播放器的 lrc.py
+SERIAL_BELOW = 64     # 文件较少时不开进程池
+CHUNK = 32
+
+def shift_stamp(m, shift):
+    # 只改数字: 原来写到毫秒 (三位小数) 的仍保留三位, 其余写成 [mm:ss.xx]
+    mm, ss = m.groups(); frac = ss.replace(':', '.').partition('.')[2]
+    ms = int(round((int(mm) * 60 + float(ss.replace(':', '.'))) * 1000))
+    return format_time(max(0, ms + shift), precise=len(frac) >= 3)
+
+def shift_text(text, shift):
+    # 只改行首的时间标签, 其余内容 (缩进 / 正文 / 标签行 / 无法解析的行 / 空行) 原样保留
+    out = []
+    for raw in text.splitlines(True):
+        body = raw.rstrip('\r\n'); lead = len(body) - len(body.lstrip())
+        stamps, pos = split_stamps(body[lead:])
+        if stamps: pos += lead; raw = body[:lead] + TIME_TAG.sub(lambda m: shift_stamp(m, shift), body[lead:pos]) + raw[pos:]
+        out.append(raw)
+    return "".join(out)
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f: f.write(data)
+    os.replace(tmp, path)
+
+def process(path, shift=0, to_utf8=False, dry_run=False):
+    # 单个歌词文件: 检查 + (可选) 平移 / 转码; 返回可序列化的结果, 供进程池使用
+    r = {"path": path, "encoding": None, "lines": 0, "errors": [], "unsorted": [], "changes": [], "failed": None}
+    try:
+        with open(path, 'rb') as f: data = f.read()
+        text, enc = decode_lrc(data); tl = parse_lrc(text)
+        r.update(encoding=enc, lines=len(tl), errors=[[no, raw] for no, raw in tl.errors], unsorted=tl.unsorted)
+        if enc == 'unknown':
+            if shift or to_utf8: r["failed"] = "无法识别编码, 未修改"
+            return r
+        out = shift_text(text, shift) if shift else text
+        if out != text: r["changes"].append(f"平移 {shift:+d}ms")
+        target = 'utf-8' if to_utf8 else enc
+        if target != enc: r["changes"].append(f"{enc} -> utf-8")
+        if r["changes"] and not dry_run: write_atomic(path, out.encode(target))
+    except (OSError, UnicodeError) as e: r["failed"] = str(e)
+    return r
+
+def collect(paths):
+    # 递归列出歌词文件与歌曲; 直接给出的文件按扩展名归类
+    lrcs = []; tracks = []
+    def add(p):
+        low = p.lower()
+        if low.endswith('.lrc'): lrcs.append(p)
+        elif low.endswith(SUPPORTED_FORMATS): tracks.append(p)
+    for p in paths:
+        if os.path.isdir(p):
+            for d, subdirs, files in os.walk(p):
+                subdirs.sort()
+                for n in sorted(files): add(os.path.join(d, n))
+        elif os.path.isfile(p): add(p)
+    return lrcs, tracks
+
+def run(paths, shift=0, to_utf8=False, dry_run=False, jobs=None):
+    lrcs, tracks = collect(paths)
+    jobs = jobs or os.cpu_count() or 1
+    args = (lrcs, [shift] * len(lrcs), [to_utf8] * len(lrcs), [dry_run] * len(lrcs))
+    if jobs == 1 or len(lrcs) < SERIAL_BELOW: results = list(map(process, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool: results = list(pool.map(process, *args, chunksize=CHUNK))
+    have = {os.path.normcase(os.path.splitext(p)[0]) for p in lrcs}
+    missing = [t for t in tracks if os.path.normcase(os.path.splitext(t)[0]) not in have]
+    return {"lyrics": results, "tracks": len(tracks), "missing": missing, "dry_run": dry_run}
+
+def print_report(report, quiet=False, out=sys.stdout):
+    res = report["lyrics"]; pr = lambda *a: print(*a, file=out)
+    changed = [r for r in res if r["changes"]]; bad = [r for r in res if r["errors"] or r["unsorted"] or r["failed"]]
+    if not quiet:
+        for r in changed: pr(f"[{'将修改' if report['dry_run'] else '已修改'}] {r['path']}: {', '.join(r['changes'])}")
+        for r in bad:
+            if r["failed"]: pr(f"[失败] {r['path']}: {r['failed']}")
+            for no, raw in r["errors"]: pr(f"[无法解析] {r['path']}:{no}: {raw.strip()}")
+            if r["unsorted"]: pr(f"[乱序] {r['path']}: 第 {', '.join(map(str, r['unsorted']))} 行的时间早于上一行")
+        for t in report["missing"]: pr(f"[无歌词] {t}")
+    non_utf8 = sum(1 for r in res if r["encoding"] not in (None, 'utf-8'))
+    pr(f"歌词 {len(res)} 个 (非 UTF-8 {non_utf8}, 有问题 {len(bad)}, {'将修改' if report['dry_run'] else '已修改'} {len(changed)}); "
+       f"歌曲 {report['tracks']} 首, 无歌词 {len(report['missing'])} 首")
+    if report["dry_run"]: pr("(试运行, 未写入任何文件)")
+
+def main(argv=None):
+    multiprocessing.freeze_support()
+    ap = argparse.ArgumentParser(prog="lrctool", description="MusePlayer 歌词批处理: 转 UTF-8 / 整体平移时间 / 检查格式 / 找出没有歌词的歌曲")
+    ap.add_argument("paths", nargs="+", help="文件夹 (递归) 或 .lrc / 音频文件")
+    ap.add_argument("--to-utf8", action="store_true", help="把非 UTF-8 (GBK / UTF-16 / 带 BOM) 的歌词转成 UTF-8")
+    ap.add_argument("--shift", type=int, default=0, metavar="MS", help="所有时间标签平移 MS 毫秒 (正数推后, 负数提前)")
+    ap.add_argument("--dry-run", action="store_true", help="只报告, 不写文件")
+    ap.add_argument("--jobs", type=int, default=0, help="并行进程数 (默认 CPU 核数)")
+    ap.add_argument("--json", metavar="FILE", help="完整结果另存为 JSON")
+    ap.add_argument("-q", "--quiet", action="store_true", help="只输出汇总")
+    args = ap.parse_args(argv)
+
+    report = run(args.paths, args.shift, args.to_utf8, args.dry_run, args.jobs or None)
+    print_report(report, args.quiet)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    # 有无法解析 / 乱序 / 处理失败的文件时返回 1
+    return 1 if any(r["errors"] or r["unsorted"] or r["failed"] for r in report["lyrics"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,26 @@
 import sys
 import os
+import time
+STARTUP_T0 = time.perf_counter()   # 启动计时起点 (其余导入之前)
+# 打包成 exe 后, 歌词批处理进程池的子进程也从这里启动: 必须最先交给 multiprocessing, 不能走到转交 / 界面
+if __name__ == "__main__":
+    import multiprocessing; multiprocessing.freeze_support()
+# 命令行歌词批处理 (python main.py --lrc-tool ...), 不启动界面
+if __name__ == "__main__" and sys.argv[1:2] == ["--lrc-tool"]:
+    import lrctool; sys.exit(lrctool.main(sys.argv[2:]))
+# 单实例: 已有窗口在运行时把参数 (文件/文件夹/播放命令) 转交给它后立即退出, 不再加载其他模块
+import instance
+if __name__ == "__main__" and instance.enabled() and instance.forward(sys.argv[1:]): sys.exit(0)
 import random
 import math
 import re
 import traceback
 import json
+import sqlite3
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- 崩溃记录 ---
 def exception_hook(exctype, value, tb):
@@ -16,57 +32,185 @@ sys.excepthook = exception_hook
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QListWidget, QSlider, QStackedWidget, QTextEdit, 
-                             QMessageBox, QFrame, QGraphicsDropShadowEffect)
-from PyQt6.QtCore import Qt, QUrl, QPoint, QPointF, QTimer, QPropertyAnimation, pyqtProperty, QEasingCurve, QSize
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+                             QListView, QSlider, QStackedWidget, QTextEdit, 
+                             QMessageBox, QFrame, QLineEdit, QMenu, QGraphicsScene, QGraphicsPixmapItem, QGraphicsBlurEffect)
+from PyQt6.QtCore import (QObject, Qt, QUrl, QPoint, QPointF, QRect, QTimer, pyqtProperty, QSize,
+                          QRectF, QThread, pyqtSignal, QElapsedTimer, QAbstractListModel, QModelIndex, QEvent, QFileSystemWatcher)
 from PyQt6.QtGui import (QIcon, QPixmap, QPainter, QColor, QPen, QFont, 
-                         QBrush, QLinearGradient, QTextCursor, QPainterPath)
+                         QBrush, QLinearGradient, QTextCursor, QPainterPath, QImage,
+                         QTextBlockFormat, QTextCharFormat, QTextFormat, QShortcut, QKeySequence)
+from library import LibraryIndex, TrackStore, read_tags, HAVE_TAGS, NO_TAGS, SUPPORTED_FORMATS
+try: import numpy as np
+except ImportError: np = None
+from lrc import LyricTimeline, LyricCache, read_lrc, format_time
+from search import SearchIndex, tokenize
+from artwork import ArtworkCache
+from perf import PERF, PerfOverlay, timed
+from waveform import PeakCache, WaveformLoader, buffer_to_array, spectrum_bands, mono_float_format, FFT_SIZE, BANDS
+from playqueue import PlayQueue
+
+# QtMultimedia 导入和播放后端初始化较慢, 放到窗口第一帧画出之后 (ModernPlayer.init_media)
+QMediaPlayer = QAudioOutput = QAudioBufferOutput = None
+def import_multimedia():
+    global QMediaPlayer, QAudioOutput, QAudioBufferOutput
+    from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
+    # QAudioBufferOutput 要 Qt 6.8+; 没有时不提供频谱, 播放不受影响
+    try: from PyQt6.QtMultimedia import QAudioBufferOutput
+    except ImportError: QAudioBufferOutput = None
 
 # --- 全局配置 ---
-SUPPORTED_FORMATS = (
-    '.mp3', '.flac', '.wav', '.ogg', '.m4a', '.wma', 
-    '.aac', '.ape', '.opus', '.alac', '.aiff', '.mp2'
-)
 ACCENT_COLOR = QColor(0, 255, 213)
 ACCENT_HEX = "#00FFD5"
 CONFIG_FILE = "settings.json"
+IDLE_MS = 15000
+WATCH_DEBOUNCE_MS = 800
+LIBRARY_DB = "library.db"
+QUEUE_FILE = "queue.json"     # 播放会话: 当前曲目 / 位置 / 随机历史 / 下一首播放 (播放模式在 settings.json)
+SORT_MODES = ("默认顺序", "标题", "艺人 / 专辑", "专辑", "时长")
+# 性能采集: MUSE_PERF=1 启动即开启; MUSE_PERF_OUT=前缀 时退出自动导出
+PERF_ENV = os.environ.get("MUSE_PERF", "") not in ("", "0")
+# 启动计时: MUSE_STARTUP=1 时曲库加载后把各阶段耗时 (JSON) 打到 stdout, =exit 时随后退出
+STARTUP_ENV = os.environ.get("MUSE_STARTUP", "")
+
+# --- 0. 统一动画时钟 ---
+class FrameClock(QObject):
+    # 所有动画共用一个单次定时器, 每次只排到最早到期的订阅者: 唤醒次数由订阅者自己的间隔决定 (不是固定帧率),
+    # 同时到期的订阅者在一次唤醒里处理, 并拿到实际经过的毫秒数;
+    # 没有活跃订阅者 (或窗口最小化) 时定时器完全停止, 事件循环不再被唤醒
+    _shared = None
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None: cls._shared = cls()
+        return cls._shared
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.subs = {}; self.suspended = False; self.ticks = 0; self.due = 0
+        self.clock = QElapsedTimer(); self.clock.start()
+        self.timer = QTimer(self); self.timer.setSingleShot(True); self.timer.setTimerType(Qt.TimerType.PreciseTimer); self.timer.timeout.connect(self.tick)
+
+    def subscribe(self, owner, callback, interval):
+        # owner 销毁时自动退订; sub = [回调, 间隔, 上次 (计划) 运行时间, 是否活跃]
+        self.subs[owner] = [callback, interval, 0, False]
+        owner.destroyed.connect(lambda *_: self.subs.pop(owner, None))
+
+    def unsubscribe(self, owner): self.subs.pop(owner, None); self.sync()
+
+    def set_interval(self, owner, interval):
+        sub = self.subs.get(owner)
+        if sub is not None and sub[1] != interval: sub[1] = interval; self.sync()
+
+    def set_active(self, owner, active):
+        sub = self.subs.get(owner)
+        if sub is None or sub[3] == active: return
+        sub[3] = active; sub[2] = self.clock.elapsed(); self.sync()
+
+    def set_suspended(self, suspended): self.suspended = suspended; self.sync()
+
+    def sync(self):
+        # 按最早到期的活跃订阅者重新排定时器
+        try:
+            due = None if self.suspended else min((sub[2] + sub[1] for sub in self.subs.values() if sub[3]), default=None)
+            if due is None: self.timer.stop(); return
+            self.due = due; self.timer.start(max(0, due - self.clock.elapsed()))
+        except RuntimeError: pass  # 退出时定时器可能先于控件被销毁
+
+    @timed("clock.tick")
+    def tick(self):
+        now = self.clock.elapsed(); self.ticks += 1
+        # 定时器抖动: 实际唤醒时间比计划晚了多少
+        if PERF.enabled: PERF.sample("clock.jitter", now - self.due)
+        for sub in list(self.subs.values()):
+            if not sub[3] or now - sub[2] < sub[1]: continue
+            # 按计划时间推进, 偶尔晚一点不会累积成降频; 落后超过一个间隔 (卡顿) 时不补帧
+            dt = now - sub[2]; sub[2] = sub[2] + sub[1] if dt < 2 * sub[1] else now; sub[0](dt)
+        self.sync()
 
 # --- 1. 动态背景 ---
 class DynamicBackground(QWidget):
-    def __init__(self, parent=None):
+    # 粒子状态存放在连续数组里 (装了 NumPy 时整体向量化更新);
+    # 渐变底色和粒子贴图都预渲染, 每帧一次 drawPixmapFragments 画完所有粒子
+    SPRITE_R = 5
+    LOW_POWER = (24, 12)
+
+    def __init__(self, parent=None, count=60, fps=33):
         super().__init__(parent)
         self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
-        self.particles = []
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_anim)
-        self.timer.start(30)
-        for _ in range(60):
-            self.particles.append({
-                'x': random.random(), 'y': random.random(),
-                'vx': (random.random()-0.5)*0.003, 'vy': (random.random()-0.5)*0.003,
-                'size': random.randint(2, 5), 'alpha': random.randint(30, 120)
-            })
-
-    def update_anim(self):
-        for p in self.particles:
-            p['x'] += p['vx']; p['y'] += p['vy']
-            if p['x']<0 or p['x']>1: p['vx']*=-1
-            if p['y']<0 or p['y']>1: p['vy']*=-1
+        self.count = count; self.fps = fps; self.low_power = False; self.idle = False
+        self.bg_cache = None; self.sprite = self.make_sprite()
+        self.clock = FrameClock.shared(); self.clock.subscribe(self, self.update_anim, 1000 // fps)
+        self.spawn()
+
+    def configure(self, count=None, fps=None, low_power=None):
+        if count is not None: self.count = max(0, int(count))
+        if fps is not None: self.fps = max(1, int(fps))
+        if low_power is not None: self.low_power = bool(low_power)
+        self.clock.set_interval(self, max(1, 1000 // self.params()[1]))
+        self.spawn(); self.sync_clock(); self.update()
+
+    def params(self): return self.LOW_POWER if self.low_power else (self.count, self.fps)
+
+    def make_sprite(self):
+        d = self.SPRITE_R * 2 + 2
+        pix = QPixmap(d, d); pix.fill(Qt.GlobalColor.transparent)
+        p = QPainter(pix); p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.setPen(Qt.PenStyle.NoPen); p.setBrush(QBrush(ACCENT_COLOR)); p.drawEllipse(QPointF(d/2, d/2), self.SPRITE_R, self.SPRITE_R); p.end()
+        return pix
+
+    def spawn(self):
+        n, _ = self.params(); rnd = random.random
+        # xy / vxy 交错存放: [x0, y0, x1, y1, ...]
+        self.xy = array('d', (rnd() for _ in range(2*n)))
+        self.vxy = array('d', ((rnd()-0.5)*0.003 for _ in range(2*n)))
+        src = QRectF(0, 0, self.sprite.width(), self.sprite.height())
+        self.fragments = []
+        for _ in range(n):
+            k = random.randint(2, 5) / self.SPRITE_R
+            self.fragments.append(QPainter.PixmapFragment.create(QPointF(), src, k, k, 0, random.randint(30, 120) / 255))
+        if np is not None: self.np_xy = np.frombuffer(self.xy); self.np_vxy = np.frombuffer(self.vxy)
+
+    def set_idle(self, idle): self.idle = idle; self.sync_clock()
+
+    def sync_clock(self):
+        # 隐藏或空闲 (暂停且长时间无操作) 时退出时钟
+        self.clock.set_active(self, self.isVisible() and not self.idle)
+
+    def showEvent(self, event): super().showEvent(event); self.sync_clock()
+    def hideEvent(self, event): super().hideEvent(event); self.sync_clock()
+    def resizeEvent(self, event): self.bg_cache = None; super().resizeEvent(event)
+
+    def update_anim(self, dt):
+        # 按实际经过的时间折算步长 (原先为每 30ms 一步), 帧率变化时粒子速度不变
+        k = dt / 30
+        if np is not None:
+            xy = self.np_xy; v = self.np_vxy
+            xy += v * k; v[(xy < 0) | (xy > 1)] *= -1
+        else:
+            xy = self.xy; v = self.vxy
+            for i in range(len(xy)):
+                xy[i] += v[i] * k
+                if xy[i] < 0 or xy[i] > 1: v[i] = -v[i]
         self.update()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        w, h = self.width(), self.height()
+    def render_background(self):
+        w, h = self.width(), self.height(); dpr = self.devicePixelRatioF()
+        self.bg_cache = QPixmap(max(1, int(w*dpr)), max(1, int(h*dpr))); self.bg_cache.setDevicePixelRatio(dpr)
+        p = QPainter(self.bg_cache)
         grad = QLinearGradient(0, 0, w, h)
         grad.setColorAt(0, QColor(10, 10, 15)); grad.setColorAt(1, QColor(5, 5, 10))
-        painter.fillRect(0, 0, w, h, grad)
-        painter.setPen(Qt.PenStyle.NoPen)
-        for p in self.particles:
-            c = QColor(ACCENT_COLOR); c.setAlpha(int(p['alpha']))
-            painter.setBrush(QBrush(c))
-            painter.drawEllipse(QPointF(p['x']*w, p['y']*h), p['size'], p['size'])
+        p.fillRect(0, 0, w, h, grad); p.end()
+
+    @timed("paint.background")
+    def paintEvent(self, event):
+        if self.bg_cache is None: self.render_background()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.bg_cache)
+        w, h = self.width(), self.height(); xy = self.xy
+        for i, f in enumerate(self.fragments): f.x = xy[2*i] * w; f.y = xy[2*i+1] * h
+        if self.fragments:
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawPixmapFragments(self.fragments, self.sprite)
 
 # --- 2. 极简线条图标 ---
 class MinimalArtGenerator:
@@ -97,19 +241,34 @@ class VinylRecord(QWidget):
         self.setFixedSize(320, 320)
         self.angle = 0; self.is_playing = False; self.cover_pixmap = None
         self.default_pixmap = MinimalArtGenerator.draw_vinyl_placeholder(320)
-        self.timer = QTimer(self); self.timer.timeout.connect(self.rotate); self.timer.start(20) 
+        # 唱片(含纹理和圆形封面)与高光各预渲染一张, 每帧只做旋转 + 贴图
+        self.disc_cache = None; self.gloss_cache = None
+        self.clock = FrameClock.shared(); self.clock.subscribe(self, self.rotate, 20)
 
-    def set_cover(self, pixmap): self.cover_pixmap = pixmap; self.update()
-    def play(self): self.is_playing = True
-    def pause(self): self.is_playing = False
-    def rotate(self):
-        if self.is_playing: self.angle = (self.angle + 0.5) % 360; self.update()
+    def set_cover(self, pixmap): self.cover_pixmap = pixmap; self.disc_cache = None; self.update()
+    def play(self): self.is_playing = True; self.sync_clock()
+    def pause(self): self.is_playing = False; self.sync_clock()
+    # 每 20ms 转 0.5 度, 按实际经过时间折算
+    def rotate(self, dt): self.angle = (self.angle + 0.5 * dt / 20) % 360; self.update()
 
-    def paintEvent(self, event):
-        p = QPainter(self); p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    def sync_clock(self):
+        # 只有在播放且可见时才需要动画帧
+        self.clock.set_active(self, self.is_playing and self.isVisible())
+
+    def showEvent(self, event): super().showEvent(event); self.sync_clock()
+    def hideEvent(self, event): super().hideEvent(event); self.sync_clock()
+    def resizeEvent(self, event): self.disc_cache = None; self.gloss_cache = None; super().resizeEvent(event)
+
+    def new_layer(self):
+        dpr = self.devicePixelRatioF()
+        pix = QPixmap(int(self.width()*dpr), int(self.height()*dpr)); pix.setDevicePixelRatio(dpr); pix.fill(Qt.GlobalColor.transparent)
+        return pix
+
+    def render_disc(self):
         w, h = self.width(), self.height(); center = QPoint(w//2, h//2)
-        p.translate(center); p.rotate(self.angle); p.translate(-center)
         r = int(min(w, h) // 2 - 10)
+        self.disc_cache = self.new_layer()
+        p = QPainter(self.disc_cache); p.setRenderHint(QPainter.RenderHint.Antialiasing)
         
         # 唱片底
         p.setBrush(QBrush(QColor(15, 15, 15))); p.setPen(Qt.PenStyle.NoPen); p.drawEllipse(center, r, r)
@@ -118,55 +277,523 @@ class VinylRecord(QWidget):
         pen = QPen(QColor(40, 40, 40)); pen.setWidth(1); p.setPen(pen); p.setBrush(Qt.BrushStyle.NoBrush)
         for i in range(r - 10, r - 80, -3): p.drawEllipse(center, i, i)
         
-        # 封面图
+        # 封面图 (只在换封面/尺寸变化时缩放一次)
         ir = int(r - 55)
         if ir > 0:
             path = QPainterPath(); path.addEllipse(QPointF(w/2, h/2), ir, ir); p.setClipPath(path)
             img = self.cover_pixmap if self.cover_pixmap else self.default_pixmap
-            if img:
-                d = int(ir * 2); sc = img.scaled(d, d, Qt.AspectRatioMode.KeepAspectRatioByExpanding, Qt.TransformationMode.SmoothTransformation)
-                p.drawPixmap(int(w//2 - sc.width()//2), int(h//2 - sc.height()//2), sc)
+            if img and not img.isNull():
+                dpr = self.disc_cache.devicePixelRatio(); d = int(ir * 2 * dpr)
+                sc = img.scaled(d, d, Qt.AspectRatioMode.KeepAspectRatioByExpanding, Qt.TransformationMode.SmoothTransformation)
+                sc.setDevicePixelRatio(dpr)
+                p.drawPixmap(QPointF(w/2 - sc.width()/dpr/2, h/2 - sc.height()/dpr/2), sc)
             p.setClipping(False)
-        
-        # 【关键】这里原本有一行绘制黑点的代码，现已确认删除
-        # p.setBrush(QBrush(QColor(0, 0, 0))); p.drawEllipse(center, 5, 5) <--- 已删除
-        
-        # 高光反光
-        p.resetTransform(); p.translate(center)
+        p.end()
+
+    def render_gloss(self):
+        w, h = self.width(), self.height(); r = int(min(w, h) // 2 - 10)
+        self.gloss_cache = self.new_layer()
+        p = QPainter(self.gloss_cache); p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # 高光反光 (不随唱片旋转)
+        p.translate(w//2, h//2)
         grad = QLinearGradient(-r, -r, r, r)
         grad.setColorAt(0, QColor(255, 255, 255, 20)); grad.setColorAt(1, QColor(255, 255, 255, 5))
         p.setBrush(QBrush(grad)); p.setPen(Qt.PenStyle.NoPen); p.drawEllipse(QPoint(0,0), r, r)
+        p.end()
+
+    @timed("paint.vinyl")
+    def paintEvent(self, event):
+        if self.disc_cache is None: self.render_disc()
+        if self.gloss_cache is None: self.render_gloss()
+        w, h = self.width(), self.height()
+        p = QPainter(self)
+        p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        p.translate(w/2, h/2); p.rotate(self.angle); p.translate(-w/2, -h/2)
+        p.drawPixmap(0, 0, self.disc_cache)
+        p.resetTransform(); p.drawPixmap(0, 0, self.gloss_cache)
+
+# --- 4. 预渲染光晕 + 呼吸按钮 ---
+def blur_image(img, radius):
+    # 离线做一次高斯模糊 (与阴影特效同一套算法), 结果缓存起来反复贴图
+    if radius <= 0: return QImage(img)
+    scene = QGraphicsScene(); item = QGraphicsPixmapItem(QPixmap.fromImage(img))
+    eff = QGraphicsBlurEffect(); eff.setBlurRadius(radius); eff.setBlurHints(QGraphicsBlurEffect.BlurHint.QualityHint)
+    item.setGraphicsEffect(eff); scene.addItem(item)
+    out = QImage(img.size(), QImage.Format.Format_ARGB32_Premultiplied); out.fill(Qt.GlobalColor.transparent)
+    p = QPainter(out); scene.render(p, QRectF(out.rect()), QRectF(img.rect())); p.end()
+    return out
+
+class GlowHalo(QWidget):
+    # 挂在按钮下方的光晕层: 每种按钮外观只预渲染几档模糊半径, 动画时在相邻两档之间交叉淡化
+    LEVELS = (6, 12, 18, 24, 30); MARGIN = 32
+
+    def __init__(self, button):
+        super().__init__(button.parentWidget())
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.button = button; self.radius = 0; self.sprites = {}
+        self.hide()
+
+    def follow(self):
+        b = self.button; m = self.MARGIN
+        if self.parentWidget() is not b.parentWidget(): self.setParent(b.parentWidget())
+        self.setGeometry(b.geometry().adjusted(-m, -m, m, m))
+        visible = self.radius > 0 and b.isVisible()
+        if visible: self.show(); self.stackUnder(b)
+        else: self.hide()
+
+    def set_radius(self, radius):
+        if radius == self.radius: return
+        self.radius = radius; self.follow(); self.update()
+
+    def layers(self):
+        b = self.button; m = self.MARGIN
+        key = (b.text(), b.isChecked(), b.width(), b.height(), b.styleSheet())
+        layers = self.sprites.get(key)
+        if layers is None:
+            # 只取按钮本身的形状 (边框 + 文字) 染成主题色, 相当于阴影特效的光源
+            src = QImage(b.width() + 2*m, b.height() + 2*m, QImage.Format.Format_ARGB32_Premultiplied); src.fill(Qt.GlobalColor.transparent)
+            p = QPainter(src); p.drawPixmap(QRect(m, m, b.width(), b.height()), b.grab())
+            p.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn); p.fillRect(src.rect(), ACCENT_COLOR); p.end()
+            layers = self.sprites[key] = [QPixmap.fromImage(blur_image(src, r)) for r in self.LEVELS]
+        return layers
+
+    @timed("paint.halo")
+    def paintEvent(self, event):
+        if self.radius <= 0: return
+        layers = self.layers(); lv = self.LEVELS; r = self.radius
+        p = QPainter(self)
+        i = bisect_left(lv, r)
+        if i == 0: p.setOpacity(r / lv[0]); p.drawPixmap(0, 0, layers[0])
+        elif i >= len(lv): p.drawPixmap(0, 0, layers[-1])
+        else:
+            f = (r - lv[i-1]) / (lv[i] - lv[i-1])
+            p.setOpacity(1 - f); p.drawPixmap(0, 0, layers[i-1]); p.setOpacity(f); p.drawPixmap(0, 0, layers[i])
+
+class GlowLabel(QLabel):
+    # 常亮的文字光晕: 每段文字只模糊一次, 按 文字/尺寸/字体 缓存 (LRU), 之后每次重绘只是贴图
+    CACHE = OrderedDict(); CACHE_SIZE = 32
+
+    def __init__(self, text="", radius=20, parent=None):
+        super().__init__(text, parent)
+        self.radius = radius; self.setContentsMargins(0, radius // 2, 0, radius // 2)
+
+    def glow_pixmap(self):
+        key = (self.text(), self.width(), self.height(), self.font().toString(), self.radius)
+        pix = self.CACHE.get(key)
+        if pix is None:
+            img = QImage(self.size(), QImage.Format.Format_ARGB32_Premultiplied); img.fill(Qt.GlobalColor.transparent)
+            p = QPainter(img); p.setFont(self.font()); p.setPen(ACCENT_COLOR)
+            p.drawText(self.contentsRect(), int(self.alignment().value) | Qt.TextFlag.TextWordWrap.value, self.text()); p.end()
+            pix = self.CACHE[key] = QPixmap.fromImage(blur_image(img, self.radius))
+            while len(self.CACHE) > self.CACHE_SIZE: self.CACHE.popitem(last=False)
+        else: self.CACHE.move_to_end(key)
+        return pix
+
+    @timed("paint.lyric")
+    def paintEvent(self, event):
+        if self.text():
+            p = QPainter(self); p.drawPixmap(0, 0, self.glow_pixmap()); p.end()
+        super().paintEvent(event)
 
-# --- 4. 呼吸按钮 ---
 class BreathingButton(QPushButton):
     def __init__(self, text="", parent=None):
         super().__init__(text, parent)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setBlurRadius(0); self.shadow.setColor(ACCENT_COLOR); self.shadow.setOffset(0, 0)
-        self.setGraphicsEffect(self.shadow)
-        self.anim = QPropertyAnimation(self, b"glowRadius")
-        self.anim.setDuration(1500); self.anim.setStartValue(0); self.anim.setEndValue(30)
-        self.anim.setEasingCurve(QEasingCurve.Type.InOutSine); self.anim.setLoopCount(-1)
+        self.halo = GlowHalo(self); self.glow = 0
+        # 呼吸光晕由统一时钟驱动: 1.5 秒一个周期, 0 -> 30 的 InOutSine 曲线
+        self.breath_start = 0
+        self.clock = FrameClock.shared(); self.clock.subscribe(self, self.breathe, 33)
 
     @pyqtProperty(int)
-    def glowRadius(self): return int(self.shadow.blurRadius())
+    def glowRadius(self): return self.glow
     @glowRadius.setter
-    def glowRadius(self, radius): self.shadow.setBlurRadius(int(radius))
-    def start_breathing(self): self.anim.start()
-    def stop_breathing(self): self.anim.stop(); self.shadow.setBlurRadius(0)
+    def glowRadius(self, radius): self.glow = int(radius); self.halo.set_radius(self.glow)
+
+    def event(self, event):
+        if event.type() in (QEvent.Type.ParentChange, QEvent.Type.Move, QEvent.Type.Resize, QEvent.Type.Show, QEvent.Type.Hide):
+            self.halo.follow()
+        return super().event(event)
+
+    def breathe(self, dt):
+        t = (self.clock.clock.elapsed() - self.breath_start) % 1500 / 1500
+        r = int(30 * (1 - math.cos(math.pi * t)) / 2)
+        if r != self.glowRadius: self.glowRadius = r
+
+    def start_breathing(self):
+        if not self.clock.subs[self][3]: self.breath_start = self.clock.clock.elapsed()
+        self.clock.set_active(self, True)
+    def stop_breathing(self): self.clock.set_active(self, False); self.glowRadius = 0
+
+# --- 5. 后台曲库扫描 ---
+class LibraryScanner(QThread):
+    # 分批回传 [(路径, 显示名)], 首批尽快送出, 之后批量逐步变大
+    batch_found = pyqtSignal(list)
+    progress = pyqtSignal(int, str)
+    scan_done = pyqtSignal(int)
+    # 校验模式: 索引与磁盘不一致时回传完整的新列表
+    revalidated = pyqtSignal(list)
+    # 增量模式 (文件夹监视): 只回传变化 - 新增 [(路径, 显示名, 大小, mtime)], 删除 [(路径, 大小, mtime)], 有变化的目录
+    delta_found = pyqtSignal(list, list, list)
+    # 扫描到的全部目录, 供文件夹监视使用
+    dirs_found = pyqtSignal(list)
+
+    FIRST_BATCH = 32; MAX_BATCH = 2048; FLUSH_MS = 100
+
+    def __init__(self, folder_path, revalidate=False, delta=False, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path; self.revalidate = revalidate or delta; self.delta = delta
+
+    def run(self):
+        self.batch = []; self.limit = self.FIRST_BATCH; self.total = 0
+        self.clock = QElapsedTimer(); self.clock.start()
+        try: idx = LibraryIndex(LIBRARY_DB)
+        except sqlite3.Error: idx = None
+        known_dirs, children, known_files = idx.snapshot() if idx and self.revalidate else ({}, {}, {})
+        dirs = []; tracks = []; changed = not self.revalidate
+        stack = [(self.folder_path, None)]
+        while stack:
+            if self.isInterruptionRequested(): return
+            d, parent = stack.pop()
+            try: mtime = os.stat(d).st_mtime_ns
+            except OSError: changed = True; continue
+            dirs.append((d, parent, mtime))
+            if known_dirs.get(d) == mtime:
+                # 目录未变化, 直接沿用索引里的文件和子目录
+                tracks.extend((p, d, sz, m, n) for p, n, sz, m in known_files.get(d, ()))
+                subdirs = children.get(d, [])
+            else:
+                changed = True; subdirs = []
+                try:
+                    with os.scandir(d) as it:
+                        for e in it:
+                            if self.isInterruptionRequested(): return
+                            try:
+                                if e.is_dir(follow_symlinks=False): subdirs.append(e.path)
+                                elif e.name.lower().endswith(SUPPORTED_FORMATS):
+                                    st = e.stat(); n = os.path.splitext(e.name)[0]
+                                    tracks.append((e.path, d, st.st_size, st.st_mtime_ns, n))
+                                    if not self.revalidate:
+                                        self.batch.append((e.path, n))
+                                        if len(self.batch) >= self.limit: self.flush(d)
+                            except OSError: continue
+                except OSError: pass
+            # 与 os.walk 自顶向下的顺序保持一致
+            stack.extend((sd, d) for sd in reversed(subdirs))
+            if self.batch and self.clock.elapsed() >= self.FLUSH_MS: self.flush(d)
+        if self.batch: self.flush(self.folder_path)
+        if len(dirs) != len(known_dirs): changed = True
+        if idx:
+            try:
+                if changed: idx.replace(self.folder_path, dirs, tracks)
+            except sqlite3.Error: pass
+            idx.close()
+        self.dirs_found.emit([d for d, _, _ in dirs])
+        if self.delta:
+            if changed:
+                old = {p: (sz, m) for fl in known_files.values() for p, _, sz, m in fl}; new = {t[0] for t in tracks}
+                self.delta_found.emit([(p, n, sz, m) for p, _, sz, m, n in tracks if p not in old],
+                                      [(p, sz, m) for p, (sz, m) in old.items() if p not in new],
+                                      [d for d, _, m in dirs if known_dirs.get(d) != m])
+        elif self.revalidate and changed: self.revalidated.emit([(p, n) for p, _, _, _, n in tracks])
+        self.scan_done.emit(len(tracks))
+
+    def flush(self, folder):
+        self.total += len(self.batch); self.batch_found.emit(self.batch); self.progress.emit(self.total, folder)
+        self.batch = []; self.limit = min(self.limit * 4, self.MAX_BATCH); self.clock.restart()
+
+# --- 6. 后台标签读取 ---
+class TagReader(QThread):
+    # 线程池分批解析文件头 (标题/艺人/专辑/音轨号/时长), 写入索引并分批回传 {路径: 标签};
+    # 索引里 mtime 没变的文件直接跳过
+    tags_found = pyqtSignal(dict)
+    BATCH = 256
+
+    def __init__(self, paths, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+
+    def run(self):
+        if not HAVE_TAGS: return
+        try: idx = LibraryIndex(LIBRARY_DB)
+        except sqlite3.Error: idx = None
+        known = idx.tag_mtimes() if idx else {}; todo = []
+        for p in self.paths:
+            if self.isInterruptionRequested(): break
+            try: m = os.stat(p).st_mtime_ns
+            except OSError: continue
+            if known.get(p) != m: todo.append((p, m))
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 2)) as pool:
+            for i in range(0, len(todo), self.BATCH):
+                if self.isInterruptionRequested(): break
+                chunk = todo[i:i+self.BATCH]
+                rows = [(p, m) + t for (p, m), t in zip(chunk, pool.map(read_tags, (p for p, _ in chunk)))]
+                if idx:
+                    try: idx.save_tags(rows)
+                    except sqlite3.Error: pass
+                self.tags_found.emit({r[0]: r[2:] for r in rows})
+        if idx: idx.close()
+
+# --- 7. 曲目列表模型 (虚拟化) ---
+class TrackListModel(QAbstractListModel):
+    # 直接读 TrackStore, 不为每首歌创建 item; 显示名在绘制可见行时才生成
+    # tags: {路径: (标题, 艺人, 专辑, 音轨号, 时长ms)}, 与播放器共用同一个字典
+    # rows: 只显示其中部分行 (搜索结果), 值为 TrackStore 中的行号
+    def __init__(self, store, tags=None, parent=None):
+        super().__init__(parent)
+        self.store = store; self.tags = tags if tags is not None else {}; self.rows = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid(): return 0
+        return len(self.store) if self.rows is None else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        row = index.row() if self.rows is None else self.rows[index.row()]
+        if row >= len(self.store): return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            t = self.tags.get(self.store[row]) if self.tags else None
+            if not t: return self.store.name(row)
+            title = t[0] or self.store.name(row)
+            return f"{title} · {t[1]}" if t[1] else title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            p = self.store[row]; t = self.tags.get(p)
+            if not t: return p
+            m, s = divmod(t[4] // 1000, 60)
+            return f"{p}\n{t[1] or '未知艺人'} / {t[2] or '未知专辑'}" + (f" #{t[3]}" if t[3] else "") + f"\n{m:02}:{s:02}"
+        return None
+
+    def append(self, paths):
+        paths = list(paths)
+        if not paths: return
+        n = len(self.store)
+        self.beginInsertRows(QModelIndex(), n, n + len(paths) - 1); self.store.extend(paths); self.endInsertRows()
+
+    def reset(self, paths=()):
+        self.beginResetModel(); self.store.clear(); self.store.extend(paths); self.endResetModel()
+
+    def reorder(self, order):
+        self.beginResetModel(); self.store.reorder(order); self.endResetModel()
+
+    def remove(self, rows):
+        # rows: 升序行号; 按连续区间从后往前删, 选中项/滚动位置由视图自行保持
+        ranges = []
+        for r in rows:
+            if ranges and ranges[-1][1] == r: ranges[-1][1] = r + 1
+            else: ranges.append([r, r + 1])
+        for a, b in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), a, b - 1); self.store.delete(a, b); self.endRemoveRows()
+
+    def rename(self, row, path):
+        self.store.replace(row, path); idx = self.index(row); self.dataChanged.emit(idx, idx)
+
+    def set_rows(self, rows):
+        self.beginResetModel(); self.rows = None if rows is None else array('I', rows); self.endResetModel()
+
+    def refresh(self):
+        # 标签到达后只通知视图重绘可见行
+        n = self.rowCount()
+        if n: self.dataChanged.emit(self.index(0), self.index(n - 1), [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole])
+
+# --- 8. 后台加载 (歌词 / 封面) + 预取 ---
+class BackgroundLoader(QObject):
+    # 包装一个带 load()/peek() 的线程安全缓存: 读取/解码都在后台线程完成, 结果通过信号回到 GUI 线程
+    loaded = pyqtSignal(str, object)
+
+    def __init__(self, cache, parent=None, name="io.load"):
+        super().__init__(parent)
+        self.cache = cache; self.pool = ThreadPoolExecutor(max_workers=1); self.closed = False; self.name = name
+
+    def request(self, key): self.submit(key, True)
+    def prefetch(self, key): self.submit(key, False)
+    def submit(self, key, notify):
+        if not self.closed: self.pool.submit(self._work, key, notify)
+    def shutdown(self): self.closed = True; self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _work(self, key, notify):
+        t = time.perf_counter()
+        try: result = self.cache.load(key)
+        except Exception: return
+        if PERF.enabled: PERF.record(self.name, t, time.perf_counter() - t)
+        if notify: self.loaded.emit(key, result)
+
+class LyricIndexer(QObject):
+    # 读取同名 .lrc 的歌词文本并分词 (供搜索), 分批回传 {歌曲路径: 词集合}; 没有歌词的歌曲不回传.
+    # 单线程按提交顺序处理; cancel() 之后已排队的任务直接作废
+    tokens_found = pyqtSignal(dict)
+    BATCH = 64
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=1); self.generation = 0; self.closed = False
+
+    def submit(self, paths):
+        if not self.closed: self.pool.submit(self._work, list(paths), self.generation)
+    def cancel(self): self.generation += 1
+    def shutdown(self): self.closed = True; self.cancel(); self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _work(self, paths, gen):
+        batch = {}
+        for p in paths:
+            if gen != self.generation: return
+            lp = os.path.splitext(p)[0] + ".lrc"
+            if not os.path.exists(lp): continue
+            try: batch[p] = tokenize(" ".join(read_lrc(lp).texts))
+            except (OSError, ValueError): continue
+            if len(batch) >= self.BATCH: self.tokens_found.emit(batch); batch = {}
+        if batch and gen == self.generation: self.tokens_found.emit(batch)
+
+# --- 9. 双缓冲播放引擎 ---
+class PlaybackEngine(QObject):
+    # 两组 QMediaPlayer/QAudioOutput: 一组在播, 另一组提前打开预测的下一首.
+    # 切歌时直接交换, 省掉 setSource 之后的解码器启动 (网络存储上尤其明显).
+    # 对外的接口与 QMediaPlayer 保持一致, 信号只转发当前在播的那一组.
+    positionChanged = pyqtSignal('qint64')
+    durationChanged = pyqtSignal('qint64')
+    mediaStatusChanged = pyqtSignal(object)
+    playbackStateChanged = pyqtSignal(object)
+    # 频谱用: 当前在播的那一组输出的音频块
+    audio_buffer = pyqtSignal(object)
+
+    def __init__(self, volume=0.7, parent=None):
+        super().__init__(parent)
+        self.active = self.make_deck(volume); self.standby = self.make_deck(volume)
+        self.current_path = None; self.standby_path = None; self.buffer_output = None
+
+    def make_deck(self, volume):
+        player = QMediaPlayer(self); out = QAudioOutput(self); out.setVolume(volume); player.setAudioOutput(out)
+        for name in ('positionChanged', 'durationChanged', 'mediaStatusChanged', 'playbackStateChanged'):
+            getattr(player, name).connect(lambda v, p=player, sig=getattr(self, name): p is self.active and sig.emit(v))
+        return player
+
+    @timed("io.set_source")
+    def load(self, path):
+        if path == self.standby_path and self.standby.mediaStatus() != QMediaPlayer.MediaStatus.InvalidMedia:
+            old = self.active; self.active, self.standby = self.standby, old
+            old.stop(); self.standby_path = None
+            if self.buffer_output is not None: old.setAudioBufferOutput(None); self.active.setAudioBufferOutput(self.buffer_output)
+            self.durationChanged.emit(self.active.duration())
+        else: self.active.setSource(QUrl.fromLocalFile(path))
+        self.current_path = path
+
+    def preload(self, path):
+        # 预测的下一首先在备用播放器里打开 (不播放)
+        if path == self.standby_path: return
+        self.standby_path = path; self.standby.setSource(QUrl.fromLocalFile(path))
+
+    def setVolume(self, volume):
+        for deck in (self.active, self.standby): deck.audioOutput().setVolume(volume)
+
+    def set_tap(self, on):
+        # 只在打开频谱时才让后端复制音频块; 始终挂在在播的那一组上
+        if QAudioBufferOutput is None: return
+        if on and self.buffer_output is None:
+            self.buffer_output = QAudioBufferOutput(mono_float_format(), self); self.buffer_output.audioBufferReceived.connect(self.audio_buffer)
+            self.active.setAudioBufferOutput(self.buffer_output)
+        elif not on and self.buffer_output is not None:
+            self.active.setAudioBufferOutput(None); self.buffer_output.deleteLater(); self.buffer_output = None
+
+    def play(self): self.active.play()
+    def pause(self): self.active.pause()
+    def stop(self): self.active.stop()
+    def setPosition(self, pos): self.active.setPosition(pos)
+    def position(self): return self.active.position()
+    def duration(self): return self.active.duration()
+    def playbackState(self): return self.active.playbackState()
+    def mediaStatus(self): return self.active.mediaStatus()
+
+# --- 10. 波形进度条 + 频谱 ---
+class WaveformSlider(QSlider):
+    # 仍是原来的 QSlider (setValue / sliderMoved 的拖动播放路径不变), 有波形数据时改画波形:
+    # 未播放/已播放两种颜色各预渲染一张, 重绘时按进度裁剪贴图; 录制歌词时在打点位置画竖线
+    def __init__(self, parent=None):
+        super().__init__(Qt.Orientation.Horizontal, parent)
+        self.setFixedHeight(36); self.peaks = None; self.markers = (); self.layers = None
+
+    def set_peaks(self, peaks): self.peaks = peaks; self.layers = None; self.update()
+    def set_markers(self, markers): self.markers = tuple(markers); self.update()
+    def resizeEvent(self, event): self.layers = None; super().resizeEvent(event)
+
+    def x_of(self, v): return self.width() * v / self.maximum() if self.maximum() > 0 else 0
+
+    def render_layers(self):
+        w, h = self.width(), self.height(); dpr = self.devicePixelRatioF(); peaks = self.peaks; n = len(peaks)
+        self.layers = []
+        for color in (QColor(70, 70, 70), ACCENT_COLOR):
+            pix = QPixmap(max(1, int(w*dpr)), max(1, int(h*dpr))); pix.setDevicePixelRatio(dpr); pix.fill(Qt.GlobalColor.transparent)
+            p = QPainter(pix); p.setPen(QPen(color, 1))
+            for x in range(w):
+                # 每个像素取对应列的最大值, 上下对称
+                v = max(peaks[x * n // w:max(x * n // w + 1, (x + 1) * n // w)])
+                a = max(1, v * (h - 4) / 510); p.drawLine(QPointF(x + 0.5, h/2 - a), QPointF(x + 0.5, h/2 + a))
+            p.end(); self.layers.append(pix)
+
+    def paintEvent(self, event):
+        if not self.peaks: super().paintEvent(event)
+        else:
+            if self.layers is None: self.render_layers()
+            h = self.height(); x = self.x_of(self.sliderPosition()); dpr = self.layers[0].devicePixelRatio()
+            p = QPainter(self); p.drawPixmap(0, 0, self.layers[0])
+            p.drawPixmap(QRectF(0, 0, x, h), self.layers[1], QRectF(0, 0, x * dpr, h * dpr))
+            p.setPen(QPen(QColor(255, 255, 255), 2)); p.drawLine(QPointF(x, 2), QPointF(x, h - 2)); p.end()
+        if self.markers:
+            p = QPainter(self); p.setPen(QPen(QColor(255, 200, 0, 160), 1)); h = self.height()
+            for m in self.markers: x = self.x_of(m); p.drawLine(QPointF(x, 0), QPointF(x, h))
+            p.end()
+
+    # 有波形时点哪里跳到哪里 (普通 QSlider 点击只按页步进)
+    def mousePressEvent(self, event):
+        if not self.peaks: return super().mousePressEvent(event)
+        self.setSliderDown(True); self.seek_to(event.position().x())
+    def mouseMoveEvent(self, event):
+        if not self.peaks: return super().mouseMoveEvent(event)
+        if self.isSliderDown(): self.seek_to(event.position().x())
+    def mouseReleaseEvent(self, event):
+        if not self.peaks: return super().mouseReleaseEvent(event)
+        self.setSliderDown(False)
+    def seek_to(self, x): self.setSliderPosition(int(min(1, max(0, x / max(1, self.width()))) * self.maximum()))
+
+class SpectrumBars(QWidget):
+    # 实时频谱: feed() 只保存最近的采样, 按帧时钟每 33ms 做一次 FFT (2048 点, 约 0.1ms), 柱子平滑下落
+    FALL = 1 / 600   # 每毫秒下落的高度比例
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(70); self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.samples = np.zeros(FFT_SIZE, np.float32); self.levels = np.zeros(BANDS); self.rate = 44100; self.fresh = False; self.running = False
+        self.clock = FrameClock.shared(); self.clock.subscribe(self, self.step, 33)
+
+    def feed(self, buf):
+        a = buffer_to_array(buf)
+        if not len(a): return
+        self.rate = buf.format().sampleRate() or self.rate
+        self.samples = np.concatenate((self.samples, a))[-FFT_SIZE:]; self.fresh = True
+
+    def set_running(self, running): self.running = running; self.sync_clock()
+    def sync_clock(self): self.clock.set_active(self, self.running and self.isVisible())
+    def showEvent(self, event): super().showEvent(event); self.sync_clock()
+    def hideEvent(self, event): super().hideEvent(event); self.sync_clock()
+
+    def step(self, dt):
+        target = spectrum_bands(self.samples, self.rate) if self.fresh else 0
+        self.fresh = False; self.levels = np.maximum(target, self.levels - dt * self.FALL); self.update()
+
+    def paintEvent(self, event):
+        w, h = self.width(), self.height(); n = len(self.levels); bw = w / n
+        p = QPainter(self); p.setPen(Qt.PenStyle.NoPen); c = QColor(ACCENT_COLOR); c.setAlpha(150); p.setBrush(c)
+        for i, v in enumerate(self.levels):
+            bh = max(1.0, v * h); p.drawRect(QRectF(i * bw + 1, h - bh, bw - 2, bh))
 
 # --- 样式表 ---
 STYLESHEET = f"""
 QMainWindow {{ background-color: #121212; }}
 QWidget {{ font-family: "Microsoft YaHei UI", sans-serif; background: transparent; }}
-QListWidget {{ 
+QListView {{ 
     background-color: rgba(20, 20, 20, 0.6); border-radius: 10px;
     color: #AAA; font-size: 13px; padding: 5px; border: 1px solid #333; outline: none;
 }}
-QListWidget::item {{ height: 40px; border-radius: 5px; padding-left: 10px; margin-bottom: 2px; }}
-QListWidget::item:selected {{ background-color: rgba(0, 255, 213, 0.1); color: {ACCENT_HEX}; border: 1px solid {ACCENT_HEX}; }}
-QListWidget::item:hover {{ background-color: rgba(255, 255, 255, 0.05); }}
+QListView::item {{ height: 40px; border-radius: 5px; padding-left: 10px; margin-bottom: 2px; }}
+QListView::item:selected {{ background-color: rgba(0, 255, 213, 0.1); color: {ACCENT_HEX}; border: 1px solid {ACCENT_HEX}; }}
+QListView::item:hover {{ background-color: rgba(255, 255, 255, 0.05); }}
 QPushButton {{
     background-color: rgba(40, 40, 40, 0.5); color: #EEE; border-radius: 5px; border: 1px solid #444; padding: 8px;
 }}
@@ -191,8 +818,13 @@ QTextEdit {{
     background-color: rgba(0,0,0,0.3); border: 1px solid #333; color: #DDD; padding: 15px; 
     font-size: 18px; border-radius: 10px; line-height: 200%;
 }}
+QLineEdit {{
+    background-color: rgba(0,0,0,0.3); border: 1px solid #333; border-radius: 8px; color: #DDD; padding: 6px 10px; font-size: 13px;
+}}
+QLineEdit:focus {{ border-color: {ACCENT_HEX}; }}
 QPushButton#WinBtn {{ background: transparent; border: none; font-size: 14px; color: #888; }}
 QPushButton#WinBtn:hover {{ color: white; background: #333; }}
+QPushButton#WinBtn:checked {{ color: {ACCENT_HEX}; }}
 QPushButton#CloseBtn {{ background: transparent; border: none; font-size: 14px; color: #888; }}
 QPushButton#CloseBtn:hover {{ color: white; background: #E81123; }}
 """
@@ -200,6 +832,7 @@ QPushButton#CloseBtn:hover {{ color: white; background: #E81123; }}
 class ModernPlayer(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.startup_marks = {}; self.startup_pending = True; self.mark_startup("startup.init")
         self.setWindowTitle("MusePlayer")
         self.resize(1150, 780)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowSystemMenuHint)
@@ -212,30 +845,104 @@ class ModernPlayer(QMainWindow):
         self.bg_effect.setGeometry(0, 0, 1150, 780)
         self.bg_effect.lower()
 
-        self.playlist = []
-        self.current_index = -1
+        self.playlist = TrackStore(); self.tags = {}; self.sort_mode = 0
+        self.track_model = TrackListModel(self.playlist, self.tags)
+        self.queue = PlayQueue(); self.resume_state = None; self.resume_at = None
         self.play_mode = 0 
-        self.lyrics_map = {}; self.lyrics_times = []
+        self.lyrics = LyricTimeline(); self.lrc_line = -1; self.lrc_path = None
+        self.lyric_loader = BackgroundLoader(LyricCache(), self, "io.lyrics"); self.lyric_loader.loaded.connect(self.on_lyrics_loaded)
+        self.art_loader = BackgroundLoader(ArtworkCache(), self, "io.artwork"); self.art_loader.loaded.connect(self.on_art_loaded)
+        self.art_path = None; self.cover_image = None
+        self.last_duration = -1; self.last_time_key = None
         
+        self.scanner = None; self._retired_threads = set()
+        self.tag_readers = set(); self.tags_changed = False
+        # 搜索索引在第一次搜索时才建立, 之后随播放列表增量更新
+        self.search = SearchIndex(); self.search_active = False; self.search_queue = deque(); self.search_pending = False
+        self.lyric_indexer = LyricIndexer(self); self.lyric_indexer.tokens_found.connect(self.on_lyric_tokens)
+        self.watcher = QFileSystemWatcher(self); self.watcher.directoryChanged.connect(self.on_dir_changed)
+        self.watch_timer = QTimer(self); self.watch_timer.setSingleShot(True); self.watch_timer.setInterval(WATCH_DEBOUNCE_MS)
+        self.watch_timer.timeout.connect(self.on_watch_timeout)
+        self.watch_root = None; self.watch_dirs = []
+        self.peak_cache = PeakCache(); self.wave_loader = None
         self.is_maker_active = False
         self.maker_raw_lines = []; self.playable_indices = []
         self.maker_step = 0; self.maker_timestamps = []
+        self.maker_line_pos = []; self.maker_formats = None
+        self.maker_dirty = set(); self.maker_flush_pending = False; self.maker_rewound = False
+        self.page_maker = None
+        # 播放器 / 曲库在第一帧之后创建 (init_media / init_library)
+        self.player = None; self.startup_folder = None; self.library_ready = False; self.remote_queue = []
 
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
-        self.audio_output.setVolume(0.7)
-        self.player.positionChanged.connect(self.update_ui_progress)
-        self.player.mediaStatusChanged.connect(self.handle_media_status)
+        # 暂停且一段时间无操作时停掉背景动画, 让事件循环彻底空闲
+        self.idle_timer = QTimer(self); self.idle_timer.setSingleShot(True); self.idle_timer.setInterval(IDLE_MS)
+        self.idle_timer.timeout.connect(self.on_idle)
+        QApplication.instance().installEventFilter(self)
 
         self.old_pos = None
         self.init_ui()
         self.load_settings()
 
+        # 性能叠加层: Ctrl+Shift+P 开关, Ctrl+Shift+D 导出 JSON 统计 + Chrome trace
+        self.perf_overlay = PerfOverlay(self)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.toggle_perf)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.dump_perf)
+        if PERF_ENV: PERF.set_enabled(True); self.perf_overlay.set_active(True)
+        self.mark_startup("startup.window")
+
+    # --- 分阶段启动: 先出窗口, 第一帧之后再初始化播放器, 再加载曲库 ---
+    def mark_startup(self, name):
+        ms = (time.perf_counter() - STARTUP_T0) * 1000; self.startup_marks[name] = ms; PERF.sample(name, ms)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_pending:
+            self.startup_pending = False; self.mark_startup("startup.first_frame"); QTimer.singleShot(0, self.init_media)
+
+    def finish_startup(self):
+        # 无界面使用 (基准测试等) 时直接完成剩余的初始化
+        self.startup_pending = False; self.init_media(); self.init_library()
+
+    def init_media(self):
+        if self.player is not None: return
+        import_multimedia()
+        self.player = PlaybackEngine(0.7, self)
+        self.player.positionChanged.connect(self.update_ui_progress)
+        self.player.mediaStatusChanged.connect(self.handle_media_status)
+        self.player.playbackStateChanged.connect(self.on_playback_state)
+        self.slider.sliderMoved.connect(self.player.setPosition)
+        if self.spectrum: self.player.audio_buffer.connect(self.spectrum.feed)
+        if QAudioBufferOutput is None: self.btn_spectrum.setChecked(False); self.btn_spectrum.setVisible(False)
+        self.apply_spectrum(); self.mark_startup("startup.media")
+        for w in self.media_controls: w.setEnabled(True)
+        QTimer.singleShot(0, self.init_library)
+
+    def init_library(self):
+        if self.library_ready: return
+        self.library_ready = True; folder = self.startup_folder
+        # 启动参数里带了文件夹时不必先加载上次的
+        if any(os.path.isdir(p) for m in self.remote_queue for p in m["paths"]): folder = None
+        try:
+            if folder and os.path.exists(folder):
+                self.resume_state = self.read_queue()
+                if not self.load_from_index(folder): self.load_music_from_dir(folder)
+        except: pass
+        self.mark_startup("startup.library")
+        queue, self.remote_queue = self.remote_queue, []
+        for msg in queue: self.on_remote(msg)
+        if STARTUP_ENV not in ("", "0"):
+            print(json.dumps({k: round(v, 2) for k, v in self.startup_marks.items()}), flush=True)
+            if STARTUP_ENV == "exit": QTimer.singleShot(0, self.close)
+
     def resizeEvent(self, event):
         self.bg_effect.setGeometry(0, 0, self.width(), self.height())
         super().resizeEvent(event)
 
+    def changeEvent(self, event):
+        # 最小化/还原时启停动画
+        if event.type() == QEvent.Type.WindowStateChange: FrameClock.shared().set_suspended(self.isMinimized())
+        super().changeEvent(event)
+
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton: self.old_pos = event.globalPosition().toPoint()
     def mouseMoveEvent(self, event):
@@ -245,6 +952,24 @@ class ModernPlayer(QMainWindow):
             self.old_pos = event.globalPosition().toPoint()
     def mouseReleaseEvent(self, event): self.old_pos = None
 
+    ACTIVITY_EVENTS = (QEvent.Type.MouseMove, QEvent.Type.MouseButtonPress, QEvent.Type.KeyPress, QEvent.Type.Wheel)
+    def eventFilter(self, obj, event):
+        if event.type() in self.ACTIVITY_EVENTS:
+            if self.player is None: return False
+            if self.bg_effect.idle: self.bg_effect.set_idle(False)
+            # 每次操作都重新计时 (start 会重启定时器), 空闲时间从最后一次操作算起
+            if self.player.playbackState()!=QMediaPlayer.PlaybackState.PlayingState: self.idle_timer.start()
+        return False
+
+    def on_playback_state(self, state):
+        playing = state == QMediaPlayer.PlaybackState.PlayingState
+        if playing: self.idle_timer.stop(); self.bg_effect.set_idle(False)
+        else: self.idle_timer.start()
+        if self.spectrum is not None: self.spectrum.set_running(playing and self.btn_spectrum.isChecked())
+
+    def on_idle(self):
+        if self.player.playbackState()!=QMediaPlayer.PlaybackState.PlayingState: self.bg_effect.set_idle(True)
+
     def init_ui(self):
         main_widget = QWidget(); self.setCentralWidget(main_widget)
         root = QVBoxLayout(main_widget); root.setContentsMargins(0,0,0,0); root.setSpacing(0)
@@ -253,9 +978,12 @@ class ModernPlayer(QMainWindow):
         tb = QHBoxLayout(title_bar); tb.setContentsMargins(15, 0, 0, 0)
         lbl_icon = QLabel(); lbl_icon.setPixmap(MinimalArtGenerator.draw_icon(20).pixmap(20,20))
         lbl_title = QLabel(" MUSE PLAYER"); lbl_title.setStyleSheet(f"color: #888; font-weight: bold; font-size: 12px;")
+        self.btn_power = QPushButton("🍃"); self.btn_power.setObjectName("WinBtn"); self.btn_power.setFixedSize(45, 35); self.btn_power.setCheckable(True); self.btn_power.setToolTip("低功耗模式"); self.btn_power.clicked.connect(self.toggle_low_power)
+        self.btn_spectrum = QPushButton("📊"); self.btn_spectrum.setObjectName("WinBtn"); self.btn_spectrum.setFixedSize(45, 35); self.btn_spectrum.setCheckable(True); self.btn_spectrum.setToolTip("实时频谱"); self.btn_spectrum.clicked.connect(self.toggle_spectrum); self.btn_spectrum.setVisible(np is not None)
+        self.btn_watch = QPushButton("👁"); self.btn_watch.setObjectName("WinBtn"); self.btn_watch.setFixedSize(45, 35); self.btn_watch.setCheckable(True); self.btn_watch.setChecked(True); self.btn_watch.setToolTip("监视文件夹, 自动同步增删的歌曲"); self.btn_watch.clicked.connect(self.toggle_watch)
         btn_min = QPushButton("—"); btn_min.setObjectName("WinBtn"); btn_min.setFixedSize(45, 35); btn_min.clicked.connect(self.showMinimized)
         btn_close = QPushButton("✕"); btn_close.setObjectName("CloseBtn"); btn_close.setFixedSize(45, 35); btn_close.clicked.connect(self.close)
-        tb.addWidget(lbl_icon); tb.addWidget(lbl_title); tb.addStretch(); tb.addWidget(btn_min); tb.addWidget(btn_close)
+        tb.addWidget(lbl_icon); tb.addWidget(lbl_title); tb.addStretch(); tb.addWidget(self.btn_spectrum); tb.addWidget(self.btn_watch); tb.addWidget(self.btn_power); tb.addWidget(btn_min); tb.addWidget(btn_close)
         root.addWidget(title_bar)
 
         content = QHBoxLayout(); content.setContentsMargins(20, 20, 20, 0)
@@ -265,8 +993,25 @@ class ModernPlayer(QMainWindow):
         btn_folder = QPushButton("📂 导入文件夹"); btn_folder.clicked.connect(self.select_folder)
         btn_files = QPushButton("➕ 添加文件"); btn_files.clicked.connect(self.select_files)
         sv.addWidget(btn_folder); sv.addWidget(btn_files)
-        self.track_list = QListWidget(); self.track_list.doubleClicked.connect(self.play_selected)
+        self.lbl_scan = QLabel("", styleSheet="color:#666; font-size:12px;")
+        sv.addWidget(self.lbl_scan)
+        self.btn_sort = QPushButton(); self.btn_sort.setToolTip("排序 / 分组"); self.btn_sort.clicked.connect(self.toggle_sort_mode); self.update_sort_btn()
+        sv.addWidget(self.btn_sort)
+        self.txt_search = QLineEdit(); self.txt_search.setPlaceholderText("🔍 搜索 歌名 / 艺人 / 歌词"); self.txt_search.setClearButtonEnabled(True)
+        self.txt_search.textChanged.connect(self.on_search_text)
+        sv.addWidget(self.txt_search)
+        self.track_list = QListView(); self.track_list.setModel(self.track_model); self.track_list.setUniformItemSizes(True)
+        self.track_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers); self.track_list.doubleClicked.connect(self.play_selected)
+        self.track_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu); self.track_list.customContextMenuRequested.connect(lambda p: self.show_track_menu(self.track_list, p))
+        # 分批布局: 重置/重排几万行时不必一次算完所有行的位置
+        self.track_list.setLayoutMode(QListView.LayoutMode.Batched); self.track_list.setBatchSize(2000)
         sv.addWidget(self.track_list)
+        self.result_model = TrackListModel(self.playlist, self.tags)
+        self.result_list = QListView(); self.result_list.setModel(self.result_model); self.result_list.setUniformItemSizes(True)
+        self.result_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers); self.result_list.doubleClicked.connect(self.play_result)
+        self.result_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu); self.result_list.customContextMenuRequested.connect(lambda p: self.show_track_menu(self.result_list, p))
+        self.result_list.setLayoutMode(QListView.LayoutMode.Batched); self.result_list.setBatchSize(2000)
+        self.result_list.hide(); sv.addWidget(self.result_list)
         self.btn_switch_mode = QPushButton("🛠️ 进入歌词工坊"); self.btn_switch_mode.clicked.connect(self.toggle_view)
         sv.addWidget(self.btn_switch_mode)
 
@@ -277,29 +1022,18 @@ class ModernPlayer(QMainWindow):
         vinyl_container = QVBoxLayout(); vinyl_container.addStretch(); vinyl_container.addWidget(self.vinyl, 0, Qt.AlignmentFlag.AlignCenter); vinyl_container.addStretch()
         
         lrc_container = QVBoxLayout()
-        self.lbl_lrc_pre = QLabel(""); self.lbl_lrc_cur = QLabel("MUSE PLAYER"); self.lbl_lrc_next = QLabel("")
+        self.lbl_lrc_pre = QLabel(""); self.lbl_lrc_cur = GlowLabel("MUSE PLAYER", 20); self.lbl_lrc_next = QLabel("")
         self.lbl_lrc_pre.setStyleSheet("color:#666; font-size:16px;")
         self.lbl_lrc_cur.setStyleSheet(f"color:{ACCENT_HEX}; font-size:32px; font-weight:900;")
-        glow = QGraphicsDropShadowEffect(self.lbl_lrc_cur); glow.setBlurRadius(20); glow.setColor(ACCENT_COLOR); glow.setOffset(0, 0)
-        self.lbl_lrc_cur.setGraphicsEffect(glow)
         self.lbl_lrc_next.setStyleSheet("color:#666; font-size:16px;")
         for l in [self.lbl_lrc_pre, self.lbl_lrc_cur, self.lbl_lrc_next]: l.setAlignment(Qt.AlignmentFlag.AlignCenter); l.setWordWrap(True)
         lrc_container.addStretch(); lrc_container.addWidget(self.lbl_lrc_pre); lrc_container.addSpacing(25); lrc_container.addWidget(self.lbl_lrc_cur); lrc_container.addSpacing(25); lrc_container.addWidget(self.lbl_lrc_next); lrc_container.addStretch()
+        self.spectrum = SpectrumBars() if np is not None else None
+        if self.spectrum: self.spectrum.hide(); lrc_container.addWidget(self.spectrum)
         ph.addLayout(vinyl_container, 4); ph.addLayout(lrc_container, 6)
 
-        page_maker = QWidget(); mv = QVBoxLayout(page_maker); mv.setContentsMargins(50, 20, 50, 20)
-        mv.addWidget(QLabel("🎹 智能歌词制作", styleSheet="font-size:24px; font-weight:bold; color:white;"))
-        self.txt_maker = QTextEdit()
-        self.txt_maker.setPlaceholderText("1. 粘贴文本\n2. 点击开始录制\n3. 听到歌词按空格\n4. 按 Backspace 回退 3 秒")
-        self.txt_maker.setAcceptRichText(True)
-        self.lbl_maker_hint = QLabel("准备就绪"); self.lbl_maker_hint.setStyleSheet(f"color:{ACCENT_HEX}; font-size:18px;")
-        mh = QHBoxLayout()
-        self.btn_rec = BreathingButton("🎙️ 开始录制 (空格打点)"); self.btn_rec.setObjectName("BreathingBtn"); self.btn_rec.setFixedSize(220, 50); self.btn_rec.setCheckable(True); self.btn_rec.clicked.connect(self.toggle_record)
-        btn_save = QPushButton("💾 手动保存"); btn_save.setFixedSize(120, 50); btn_save.clicked.connect(self.save_lrc)
-        mh.addWidget(self.btn_rec); mh.addWidget(btn_save); mh.addStretch()
-        mv.addWidget(self.txt_maker); mv.addWidget(self.lbl_maker_hint); mv.addLayout(mh)
-
-        self.stack.addWidget(page_play); self.stack.addWidget(page_maker)
+        # 歌词工坊页在第一次切换过去时才创建 (ensure_maker_page)
+        self.stack.addWidget(page_play)
         content.addWidget(sidebar); content.addWidget(self.stack)
 
         bottom_bar = QFrame(); bottom_bar.setObjectName("BottomBar"); bottom_bar.setFixedHeight(100)
@@ -314,115 +1048,467 @@ class ModernPlayer(QMainWindow):
         ctrl.addWidget(bp); ctrl.addSpacing(15); ctrl.addWidget(self.btn_play); ctrl.addSpacing(15); ctrl.addWidget(bn)
         prog = QVBoxLayout()
         self.lbl_time = QLabel("00:00 / 00:00", styleSheet="color: #888; font-size: 12px;")
-        self.slider = QSlider(Qt.Orientation.Horizontal); self.slider.setCursor(Qt.CursorShape.PointingHandCursor); self.slider.sliderMoved.connect(self.player.setPosition)
+        self.slider = WaveformSlider(); self.slider.setCursor(Qt.CursorShape.PointingHandCursor)
         prog.addWidget(self.lbl_time, 0, Qt.AlignmentFlag.AlignRight); prog.addWidget(self.slider)
         bh.addWidget(self.btn_mode); bh.addStretch(); bh.addLayout(ctrl); bh.addStretch(); bh.addLayout(prog); bh.setStretch(4, 1)
         root.addWidget(title_bar); root.addLayout(content); root.addWidget(bottom_bar)
+        # 依赖播放器的控件在 init_media 之前先禁用; 其余输入 (拖动窗口 / 导入 / 搜索等) 照常
+        self.media_controls = (bp, self.btn_play, bn, self.slider, self.btn_spectrum, self.btn_switch_mode)
+        for w in self.media_controls: w.setEnabled(False)
 
-    def toggle_play_mode(self): self.play_mode = (self.play_mode + 1) % 3; self.update_mode_btn()
+    def toggle_play_mode(self):
+        self.play_mode = (self.play_mode + 1) % 3; self.update_mode_btn()
+        self.queue.set_shuffle(self.play_mode == 2); self.save_settings(play_mode=self.play_mode)
+        if self.current_index != -1: self.prefetch_next()
     def update_mode_btn(self):
         modes = [("🔁 列表循环", "按顺序"), ("🔂 单曲循环", "重复当前"), ("🔀 随机播放", "随机选择")]
         t, tip = modes[self.play_mode]; self.btn_mode.setText(t); self.btn_mode.setToolTip(tip)
 
-    # --- 递归扫描文件夹 + 保存配置 ---
+    # --- 递归扫描文件夹 (后台线程, 分批加入列表) + 保存配置 ---
     def load_music_from_dir(self, folder_path):
-        self.playlist = []
-        self.track_list.clear()
-        for root, dirs, files in os.walk(folder_path):
-            for f in files:
-                if f.lower().endswith(SUPPORTED_FORMATS):
-                    full_path = os.path.join(root, f)
-                    self.playlist.append(full_path)
-                    self.track_list.addItem(os.path.splitext(f)[0])
-        
-        if self.playlist:
-            self.current_index = 0
-            self.play_music(self.playlist[0])
+        self.cancel_scan(); self.cancel_tags(); self.clear_playlist()
+        self.lbl_scan.setText("🔍 正在扫描...")
+        self.start_scan(folder_path)
+
+    def load_from_index(self, folder_path):
+        # 用上次的索引立即填充列表, 再在后台校验有变化的目录
+        try:
+            idx = LibraryIndex(LIBRARY_DB)
+            try:
+                rows = idx.tracks() if idx.root() == folder_path else []
+                if rows: self.tags.update(idx.tags())
+            finally: idx.close()
+        except sqlite3.Error: return False
+        if not rows: return False
+        self.cancel_scan(); self.cancel_tags(); self.clear_playlist(); self.add_tracks(rows)
+        if self.sort_mode: self.apply_sort()
+        self.lbl_scan.setText(f"共 {len(self.playlist)} 首 · 🔄 校验中...")
+        self.start_scan(folder_path, revalidate=True)
+        return True
+
+    def start_scan(self, folder_path, revalidate=False, delta=False):
+        self.watch_root = folder_path
+        self.scanner = LibraryScanner(folder_path, revalidate, delta)
+        self.scanner.batch_found.connect(self.on_scan_batch)
+        self.scanner.progress.connect(self.on_scan_progress)
+        self.scanner.revalidated.connect(self.on_scan_revalidated)
+        self.scanner.delta_found.connect(self.on_scan_delta)
+        self.scanner.dirs_found.connect(self.on_scan_dirs)
+        self.scanner.scan_done.connect(self.on_scan_done)
+        self.scanner.start()
+
+    def cancel_scan(self):
+        old = self.scanner; self.scanner = None
+        if old is None: return
+        old.requestInterruption(); self.retire(old)
+
+    def retire(self, thread):
+        # 线程结束前保留引用, 避免 QThread 在运行中被回收
+        if thread.isRunning():
+            self._retired_threads.add(thread)
+            thread.finished.connect(lambda t=thread: self._retired_threads.discard(t))
+
+    # --- 标签读取 + 排序/分组 ---
+    def start_tag_reader(self, paths):
+        reader = TagReader(paths); self.tag_readers.add(reader)
+        reader.tags_found.connect(self.on_tags_found); reader.finished.connect(self.on_tags_done)
+        reader.start(); self.retire(reader)
+
+    def cancel_tags(self):
+        for r in self.tag_readers: r.requestInterruption()
+        self.tag_readers.clear()
+
+    def on_tags_found(self, tags):
+        if self.sender() not in self.tag_readers: return
+        self.tags.update(tags); self.tags_changed = True; self.track_model.refresh(); self.result_model.refresh()
+        if self.search_active: self.search_queue.extend(tags); self.schedule_indexing()
+
+    def on_tags_done(self):
+        self.tag_readers.discard(self.sender())
+        # 全部读完再重新排序, 避免列表在读取过程中来回跳动
+        if not self.tag_readers and self.tags_changed:
+            self.tags_changed = False
+            if self.sort_mode: self.apply_sort()
+
+    def toggle_sort_mode(self):
+        self.sort_mode = (self.sort_mode + 1) % len(SORT_MODES); self.update_sort_btn()
+        self.apply_sort(); self.save_settings(sort_mode=self.sort_mode)
+    def update_sort_btn(self): self.btn_sort.setText(f"⇅ {SORT_MODES[self.sort_mode]}")
+
+    def apply_sort(self):
+        # 只按内存里的标签排序 (5 万首约 0.1 秒), 不读文件; 艺人/专辑模式下同组曲目排在一起
+        store = self.playlist; n = len(store)
+        if n < 2: return
+        if self.sort_mode == 0: keys = store.added
+        else:
+            get = self.tags.get; mode = self.sort_mode; keys = []
+            for i, p in enumerate(store):
+                t = get(p, NO_TAGS); title = (t[0] or store.name(i)).casefold()
+                if mode == 1: keys.append(title)
+                elif mode == 2: ar = t[1].casefold(); keys.append((not ar, ar, t[2].casefold(), t[3], title))
+                elif mode == 3: al = t[2].casefold(); keys.append((not al, al, t[3], title))
+                else: keys.append((not t[4], t[4], title))
+        order = sorted(range(n), key=keys.__getitem__)
+        # 播放队列 (当前曲目 / 随机历史 / 下一首播放) 跟着重排, 顺序不变
+        self.track_model.reorder(order); self.queue.reorder(order)
+        if self.current_index != -1: self.select_row(self.current_index); self.prefetch_next()
+        self.refresh_search()
+
+    # --- 搜索 (倒排索引, 增量维护) ---
+    def ensure_search_index(self):
+        if self.search_active: return
+        self.search_active = True; self.index_tracks(self.playlist)
+
+    def index_tracks(self, paths):
+        # 播放列表新增曲目: 名称/标签放进分时队列, 歌词文本交给后台线程读取
+        if not self.search_active: return
+        paths = list(paths)
+        if not paths: return
+        self.search_queue.extend(paths); self.schedule_indexing(); self.lyric_indexer.submit(paths)
+
+    def name_tokens(self, path):
+        text = os.path.splitext(os.path.basename(path))[0]
+        t = self.tags.get(path)
+        if t: text = " ".join((text, t[0], t[1], t[2]))
+        return tokenize(text)
+
+    def schedule_indexing(self):
+        if not self.search_pending: self.search_pending = True; QTimer.singleShot(0, self.index_pending)
+
+    def index_pending(self):
+        # 每次最多占用 GUI 线程约 8ms, 几万首歌分多次完成
+        self.search_pending = False; q = self.search_queue
+        clock = QElapsedTimer(); clock.start()
+        while q and clock.elapsed() < 8:
+            p = q.popleft()
+            if self.playlist.index_of(p) != -1: self.search.set(p, 'name', self.name_tokens(p))
+        if q: self.schedule_indexing()
+        else: self.refresh_search()
+
+    def on_lyric_tokens(self, found):
+        for p, tokens in found.items():
+            if self.playlist.index_of(p) != -1: self.search.set(p, 'lrc', tokens)
+        self.refresh_search()
+
+    def on_search_text(self, text):
+        self.ensure_search_index(); self.refresh_search()
+
+    def refresh_search(self):
+        text = self.txt_search.text().strip()
+        found = self.search.search(text) if text else None
+        if found is None:
+            if self.result_model.rows is not None: self.result_model.set_rows(None)
+            self.result_list.hide(); self.track_list.show(); return
+        rows = self.playlist.row_map()
+        self.result_model.set_rows(sorted(r for r in map(rows.get, found) if r is not None))
+        self.track_list.hide(); self.result_list.show()
+
+    def play_result(self, index):
+        row = self.result_model.rows[index.row()]
+        if row < len(self.playlist): self.queue.jump(row); self.select_row(row); self.play_music(self.playlist[row])
+
+    def clear_playlist(self):
+        self.queue.reset(); self.track_model.reset()
+        self.search.clear(); self.search_queue.clear(); self.lyric_indexer.cancel(); self.refresh_search()
+
+    def add_tracks(self, rows):
+        self.track_model.append(p for p, _ in rows); self.queue.extend_to(len(self.playlist)); self.index_tracks(p for p, _ in rows)
+        if self.current_index == -1 and self.playlist:
+            row = self.resume_session()
+            self.select_row(row); self.play_music(self.playlist[row])
             self.player.pause(); self.vinyl.pause(); self.btn_play.setText("▶"); self.btn_play.stop_breathing()
 
-    def save_settings(self, folder_path):
+    def on_scan_batch(self, batch):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        self.add_tracks(batch)
+
+    def on_scan_revalidated(self, rows):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        # 磁盘内容有变化: 替换列表, 尽量保持当前曲目不变
+        state = self.queue_state(); paths = [p for p, _ in rows]
+        if self.search_active:
+            # 只对增删的曲目更新搜索索引
+            new = set(paths); old = set(self.search.ids) | set(self.search_queue)
+            for p in old - new: self.search.remove(p)
+            self.index_tracks(p for p in paths if p not in old)
+        was = self.current_index; self.track_model.reset(paths); self.queue.reset(len(paths))
+        if not self.restore_queue(state): self.current_index = min(was, len(self.playlist) - 1)
+        if self.current_index != -1: self.select_row(self.current_index)
+        self.refresh_search()
+
+    def select_row(self, row):
+        idx = self.track_model.index(row)
+        self.track_list.setCurrentIndex(idx); self.track_list.scrollTo(idx)
+
+    def on_scan_progress(self, count, folder):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        self.lbl_scan.setText(f"🔍 已找到 {count} 首...")
+
+    def on_scan_done(self, count):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        self.lbl_scan.setText(f"共 {len(self.playlist)} 首")
+        if self.scanner.delta: return
+        if self.sort_mode: self.apply_sort()
+        self.start_tag_reader(self.playlist)
+
+    # --- 文件夹监视: 目录变化后防抖, 再做一次增量扫描, 只把增删/重命名应用到列表 ---
+    def toggle_watch(self):
+        self.save_settings(watch=self.btn_watch.isChecked()); self.sync_watch_dirs(self.watch_dirs)
+
+    def on_scan_dirs(self, dirs):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        self.watch_dirs = dirs; self.sync_watch_dirs(dirs)
+
+    def sync_watch_dirs(self, dirs):
+        want = set(dirs) if self.btn_watch.isChecked() else set()
+        have = set(self.watcher.directories())
+        if have - want: self.watcher.removePaths(list(have - want))
+        if want - have: self.watcher.addPaths(list(want - have))
+        if not want: self.watch_timer.stop()
+
+    def on_dir_changed(self, path):
+        # 连续的文件事件 (复制一张专辑等) 合并成一次扫描
+        self.watch_timer.start()
+
+    def on_watch_timeout(self):
+        if not self.watch_root or not self.btn_watch.isChecked(): return
+        if self.scanner is not None and self.scanner.isRunning(): self.watch_timer.start(); return
+        self.start_scan(self.watch_root, delta=True)
+
+    def on_scan_delta(self, added, removed, changed_dirs):
+        if self.scanner is None or self.sender() is not self.scanner: return
+        store = self.playlist; cur = store[self.current_index] if 0 <= self.current_index < len(store) else None
+        # 大小和 mtime 都相同的一删一增视为重命名: 原位替换, 行号不变
+        gone = {}
+        for p, sz, m in removed: gone.setdefault((sz, m), []).append(p)
+        fresh = []
+        for p, n, sz, m in added:
+            olds = gone.get((sz, m))
+            i = store.index_of(olds.pop()) if olds else -1
+            if i == -1: fresh.append((p, n)); continue
+            old = store[i]; self.track_model.rename(i, p)
+            if old in self.tags: self.tags[p] = self.tags.pop(old)
+            if old == cur: cur = p; self.player.current_path = p
+            self.search.remove(old); self.index_tracks([p])
+        rows = sorted(i for i in (store.index_of(p) for ps in gone.values() for p in ps) if i != -1)
+        if rows:
+            was = self.current_index; before = sum(1 for r in rows if r < was)
+            self.track_model.remove(rows); self.queue.remove(rows)
+            for ps in gone.values():
+                for p in ps: self.search.remove(p)
+            self.current_index = store.index_of(cur) if cur is not None and store.index_of(cur) != -1 else min(was - before, len(store) - 1)
+        if fresh: self.add_tracks(fresh)
+        # 有变化的目录里的歌词/封面可能增删过: 清缓存, 当前曲目立即重新加载
+        paths = [store[i] for i in store.rows_in_dirs(changed_dirs)]
+        for p in paths: self.lyric_loader.cache.invalidate(self.lrc_path_for(p)); self.art_loader.cache.invalidate(p)
+        if self.search_active:
+            for p in paths: self.search.set(p, 'lrc', ())
+            self.lyric_indexer.submit(paths)
+        if paths: self.start_tag_reader(paths)
+        if cur is not None and cur in paths: self.load_cover(cur); self.load_lrc_view(cur)
+        if self.sort_mode and (fresh or rows): self.apply_sort()
+        elif self.current_index != -1: self.select_row(self.current_index); self.prefetch_next()
+        self.refresh_search(); self.lbl_scan.setText(f"共 {len(store)} 首")
+
+    def read_settings(self):
+        if os.path.exists(CONFIG_FILE):
+            try:
+                with open(CONFIG_FILE, 'r', encoding='utf-8') as f: return json.load(f)
+            except: pass
+        return {}
+
+    def save_settings(self, **values):
+        data = self.read_settings(); data.update(values)
         try:
             with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump({'last_folder': folder_path}, f)
+                json.dump(data, f)
         except: pass
 
     def load_settings(self):
-        if os.path.exists(CONFIG_FILE):
-            try:
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    last_folder = data.get('last_folder')
-                    if last_folder and os.path.exists(last_folder):
-                        self.load_music_from_dir(last_folder)
-            except: pass
+        data = self.read_settings()
+        try:
+            # 背景粒子: 数量 / 帧率 / 低功耗模式
+            self.bg_effect.configure(data.get('bg_particles'), data.get('bg_fps'), data.get('low_power', False))
+            self.btn_power.setChecked(self.bg_effect.low_power)
+            self.sort_mode = int(data.get('sort_mode', 0)) % len(SORT_MODES); self.update_sort_btn()
+            self.btn_watch.setChecked(data.get('watch', True))
+            self.play_mode = int(data.get('play_mode', 0)) % 3; self.update_mode_btn(); self.queue.set_shuffle(self.play_mode == 2)
+            self.btn_spectrum.setChecked(bool(data.get('spectrum', False)) and np is not None)
+            # 上次的文件夹在 init_library 里加载
+            self.startup_folder = data.get('last_folder')
+        except: pass
+
+    def toggle_low_power(self):
+        self.bg_effect.configure(low_power=self.btn_power.isChecked())
+        self.save_settings(low_power=self.bg_effect.low_power)
 
     def select_folder(self):
         d = QFileDialog.getExistingDirectory(self, "目录")
-        if d: self.load_music_from_dir(d); self.save_settings(d)
+        if d: self.load_music_from_dir(d); self.save_settings(last_folder=d)
+
+    def toggle_perf(self):
+        PERF.set_enabled(not PERF.enabled); self.perf_overlay.set_active(PERF.enabled)
+
+    def dump_perf(self, prefix=None):
+        prefix = prefix or time.strftime("perf_%Y%m%d_%H%M%S")
+        try:
+            PERF.dump_json(prefix + ".json"); PERF.dump_chrome_trace(prefix + ".trace.json")
+            self.lbl_scan.setText(f"📈 已导出 {prefix}.json / .trace.json")
+        except OSError as e: self.lbl_scan.setText(f"导出失败: {e}")
+
+    def closeEvent(self, event):
+        if PERF.enabled and os.environ.get("MUSE_PERF_OUT"): self.dump_perf(os.environ["MUSE_PERF_OUT"])
+        self.save_queue()
+        self.cancel_scan(); self.cancel_tags(); self.lyric_loader.shutdown(); self.art_loader.shutdown(); self.lyric_indexer.shutdown()
+        if self.wave_loader is not None: self.wave_loader.cancel()
+        for t in list(self._retired_threads): t.wait(2000)
+        super().closeEvent(event)
 
     def select_files(self):
         fs,_ = QFileDialog.getOpenFileNames(self, "文件", "", "Audio (*.mp3 *.flac *.wav)")
         if fs:
-            self.playlist.extend(fs)
-            for f in fs: self.track_list.addItem(os.path.splitext(os.path.basename(f))[0])
-            if self.current_index==-1: self.current_index=0; self.play_music(self.playlist[0])
+            self.track_model.append(fs); self.queue.extend_to(len(self.playlist)); self.start_tag_reader(fs); self.index_tracks(fs)
+            if self.current_index==-1: self.queue.jump(0); self.play_music(self.playlist[0])
+
+    def open_files(self, files):
+        # 已在列表里的直接播放, 其余追加到末尾; 播放传入的第一首
+        new = [p for p in dict.fromkeys(files) if self.playlist.index_of(p) == -1]
+        if new: self.track_model.append(new); self.queue.extend_to(len(self.playlist)); self.start_tag_reader(new); self.index_tracks(new)
+        self.queue.jump(self.playlist.index_of(files[0])); self.select_row(self.current_index); self.play_music(files[0])
+
+    # --- 其他进程转交来的文件 / 命令 (见 instance.py); 曲库加载完之前先排队 ---
+    def on_remote(self, msg):
+        if not msg["paths"] and not msg["commands"]: return
+        if not self.library_ready: self.remote_queue.append(msg); return
+        files = []
+        for p in msg["paths"]:
+            if os.path.isdir(p): self.load_music_from_dir(p); self.save_settings(last_folder=p)
+            elif os.path.isfile(p) and p.lower().endswith(SUPPORTED_FORMATS): files.append(p)
+        if files: self.open_files(files)
+        for c in msg["commands"]:
+            playing = self.player.playbackState()==QMediaPlayer.PlaybackState.PlayingState
+            if c == "toggle" or (c == "play" and not playing) or (c == "pause" and playing): self.toggle_play()
+            elif c == "next": self.next_song()
+            elif c == "prev": self.prev_song()
+        if msg["paths"] or "show" in msg["commands"]:
+            if self.isMinimized(): self.showNormal()
+            self.raise_(); self.activateWindow()
 
     def play_selected(self):
-        idx = self.track_list.currentRow()
-        if idx!=-1: self.current_index=idx; self.play_music(self.playlist[idx])
+        idx = self.track_list.currentIndex().row()
+        if idx!=-1: self.queue.jump(idx); self.play_music(self.playlist[idx])
 
+    @timed("play_music")
     def play_music(self, path):
-        self.player.setSource(QUrl.fromLocalFile(path)); self.player.play()
+        if self.player is None: self.init_media()   # 启动完成前就要播放 (如扫描结果先到)
+        self.player.load(path); self.player.play()
         self.btn_play.setText("⏸"); self.btn_play.start_breathing(); self.vinyl.play()
-        d = os.path.dirname(path); found = False
-        base_name = os.path.splitext(os.path.basename(path))[0]
-        for n in [base_name+".jpg", base_name+".png", 'cover.jpg','cover.png','folder.jpg','folder.png']:
-            p = os.path.join(d,n)
-            if os.path.exists(p): self.vinyl.set_cover(QPixmap(p)); found=True; break
-        if not found: self.vinyl.set_cover(None)
-        self.load_lrc_view(path)
+        self.load_cover(path); self.load_waveform(path)
+        self.load_lrc_view(path); self.prefetch_next(); self.save_queue()
         if self.is_maker_active: self.toggle_record()
 
+    # --- 波形 / 频谱 ---
+    def load_waveform(self, path):
+        # 缓存里有峰值 (1KB) 直接画; 否则在后台解码整首歌生成, 期间显示普通进度条
+        if np is None: return
+        if self.wave_loader is not None: self.wave_loader.cancel(); self.wave_loader = None
+        peaks = self.peak_cache.read(path); self.slider.set_peaks(peaks)
+        if peaks: return
+        self.wave_loader = WaveformLoader(path, self.peak_cache); self.wave_loader.peaks_ready.connect(self.on_peaks)
+        self.wave_loader.start(); self.retire(self.wave_loader)
+
+    def on_peaks(self, path, peaks):
+        if path == self.player.current_path: self.slider.set_peaks(peaks)
+
+    def toggle_spectrum(self):
+        self.apply_spectrum(); self.save_settings(spectrum=self.btn_spectrum.isChecked())
+
+    def apply_spectrum(self):
+        if self.spectrum is None: return
+        on = self.btn_spectrum.isChecked(); self.player.set_tap(on); self.spectrum.setVisible(on)
+        self.spectrum.set_running(on and self.player.playbackState()==QMediaPlayer.PlaybackState.PlayingState)
+
     def toggle_play(self):
         if self.player.playbackState()==QMediaPlayer.PlaybackState.PlayingState:
             self.player.pause(); self.btn_play.setText("▶"); self.btn_play.stop_breathing(); self.vinyl.pause()
         else: self.player.play(); self.btn_play.setText("⏸"); self.btn_play.start_breathing(); self.vinyl.play()
 
+    def load_cover(self, path):
+        # 封面在后台解析 (同名图片 / 内嵌 / 目录封面) 并缩放好; 命中缓存时立即显示
+        self.art_path = path
+        img = self.art_loader.cache.peek(path)
+        self.show_cover(img)
+        self.art_loader.request(path)
+
+    def on_art_loaded(self, path, img):
+        if path == self.art_path and img is not self.cover_image: self.show_cover(img)
+
+    def show_cover(self, img):
+        self.cover_image = img
+        self.vinyl.set_cover(QPixmap.fromImage(img) if img is not None and not img.isNull() else None)
+
+    def lrc_path_for(self, path): return os.path.splitext(path)[0]+".lrc"
+
     def load_lrc_view(self, path):
-        p = os.path.splitext(path)[0]+".lrc"; self.lyrics_map={}; self.lyrics_times=[]
-        self.lbl_lrc_cur.setText("暂无歌词"); self.lbl_lrc_pre.clear(); self.lbl_lrc_next.clear()
-        if os.path.exists(p):
-            for enc in ['utf-8-sig', 'utf-8', 'gbk', 'gb18030']:
-                try:
-                    temp_map = {}; temp_times = []
-                    with open(p, 'r', encoding=enc) as f:
-                        for l in f:
-                            l = l.strip()
-                            if "]" in l:
-                                t_str, content = l.split("]", 1); t_str = t_str.strip("[")
-                                if ":" in t_str:
-                                    m_str, s_str = t_str.split(":", 1)
-                                    ms = int(int(m_str) * 60000 + float(s_str) * 1000)
-                                    temp_map[ms] = content.strip(); temp_times.append(ms)
-                    if temp_times:
-                        self.lyrics_map = temp_map; self.lyrics_times = sorted(temp_times)
-                        self.lbl_lrc_cur.setText("歌词已加载"); break 
-                except: continue
+        # 命中缓存 (通常由预取得到) 时立即显示, 否则等后台解析完成; GUI 线程不读歌词文件
+        self.lrc_path = self.lrc_path_for(path)
+        tl = self.lyric_loader.cache.peek(self.lrc_path)
+        self.show_lyrics(tl if tl is not None else LyricTimeline(), pending=tl is None)
+        self.lyric_loader.request(self.lrc_path)
+
+    def on_lyrics_loaded(self, lrc_path, tl):
+        if lrc_path != self.lrc_path or tl is self.lyrics: return
+        self.show_lyrics(tl)
+
+    def show_lyrics(self, tl, pending=False):
+        self.lyrics = tl; self.lrc_line = -1
+        self.lbl_lrc_pre.clear(); self.lbl_lrc_next.clear()
+        self.lbl_lrc_cur.setText("歌词加载中..." if pending else ("歌词已加载" if len(tl) else "暂无歌词"))
 
+    def prefetch_next(self):
+        # 随机模式下 peek 会提前抽好下一首, 预取和 skip 拿到的是同一首
+        i = self.queue.peek()
+        if i != -1:
+            nxt = self.playlist[i]
+            self.player.preload(nxt); self.lyric_loader.prefetch(self.lrc_path_for(nxt)); self.art_loader.prefetch(nxt)
+
+    @timed("position.update")
     def update_ui_progress(self, pos):
-        self.slider.setValue(pos); self.slider.setMaximum(self.player.duration())
-        m,s = divmod(pos//1000,60); dm,ds = divmod(self.player.duration()//1000,60)
-        self.lbl_time.setText(f"{m:02}:{s:02} / {dm:02}:{ds:02}")
-        if not self.is_maker_active and self.lyrics_times:
-            ts = [t for t in self.lyrics_times if t<=pos + 200]
-            if ts:
-                cur = ts[-1]; idx = self.lyrics_times.index(cur)
-                self.lbl_lrc_cur.setText(self.lyrics_map[cur])
-                self.lbl_lrc_pre.setText(self.lyrics_map[self.lyrics_times[idx-1]] if idx>0 else "")
-                self.lbl_lrc_next.setText(self.lyrics_map[self.lyrics_times[idx+1]] if idx<len(self.lyrics_times)-1 else "")
+        # 只在时长/秒数/歌词行真正变化时才更新控件, 避免每次 tick 都重绘发光的歌词标签
+        dur = self.player.duration()
+        if dur != self.last_duration: self.last_duration = dur; self.slider.setMaximum(dur)
+        self.slider.setValue(pos)
+        key = (pos//1000, dur//1000)
+        if key != self.last_time_key:
+            self.last_time_key = key
+            m,s = divmod(key[0],60); dm,ds = divmod(key[1],60)
+            self.lbl_time.setText(f"{m:02}:{s:02} / {dm:02}:{ds:02}")
+        if not self.is_maker_active and len(self.lyrics):
+            idx = self.lyrics.index_at(pos + 200)
+            if idx != -1 and idx != self.lrc_line:
+                self.lrc_line = idx
+                self.lbl_lrc_cur.setText(self.lyrics.text(idx))
+                self.lbl_lrc_pre.setText(self.lyrics.text(idx-1))
+                self.lbl_lrc_next.setText(self.lyrics.text(idx+1))
+
+    def ensure_maker_page(self):
+        if self.page_maker is not None: return
+        self.page_maker = QWidget(); mv = QVBoxLayout(self.page_maker); mv.setContentsMargins(50, 20, 50, 20)
+        mv.addWidget(QLabel("🎹 智能歌词制作", styleSheet="font-size:24px; font-weight:bold; color:white;"))
+        self.txt_maker = QTextEdit()
+        self.txt_maker.setPlaceholderText("1. 粘贴文本\n2. 点击开始录制\n3. 听到歌词按空格\n4. 按 Backspace 回退 3 秒")
+        self.txt_maker.setAcceptRichText(True)
+        self.lbl_maker_hint = QLabel("准备就绪"); self.lbl_maker_hint.setStyleSheet(f"color:{ACCENT_HEX}; font-size:18px;")
+        mh = QHBoxLayout()
+        self.btn_rec = BreathingButton("🎙️ 开始录制 (空格打点)"); self.btn_rec.setObjectName("BreathingBtn"); self.btn_rec.setFixedSize(220, 50); self.btn_rec.setCheckable(True); self.btn_rec.clicked.connect(self.toggle_record)
+        btn_save = QPushButton("💾 手动保存"); btn_save.setFixedSize(120, 50); btn_save.clicked.connect(self.save_lrc)
+        mh.addWidget(self.btn_rec); mh.addWidget(btn_save); mh.addStretch()
+        mv.addWidget(self.txt_maker); mv.addWidget(self.lbl_maker_hint); mv.addLayout(mh)
+        self.stack.addWidget(self.page_maker)
 
     def toggle_view(self):
         if self.stack.currentIndex()==0: 
+            self.ensure_maker_page()
             self.stack.setCurrentIndex(1); self.btn_switch_mode.setText("🎵 返回播放")
             self.player.pause(); self.player.setPosition(0); self.vinyl.pause()
             self.btn_play.setText("▶"); self.btn_play.stop_breathing()
@@ -441,33 +1527,66 @@ class ModernPlayer(QMainWindow):
         if self.btn_rec.isChecked():
             raw = self.txt_maker.toPlainText().strip()
             if not raw: self.btn_rec.setChecked(False); QMessageBox.warning(self,"提示","请先粘贴歌词"); return
-            self.maker_raw_lines = raw.split('\n'); self.playable_indices = []
+            self.maker_raw_lines = raw.split('\n')
+            # 行分类只做一次: 每行对应的可录制序号, 跳过的行记为 -1
+            self.maker_line_pos = []; self.playable_indices = []
             for i, l in enumerate(self.maker_raw_lines):
-                if not self.is_skippable(l): self.playable_indices.append(i)
+                if self.is_skippable(l): self.maker_line_pos.append(-1)
+                else: self.maker_line_pos.append(len(self.playable_indices)); self.playable_indices.append(i)
             if not self.playable_indices: self.btn_rec.setChecked(False); QMessageBox.warning(self,"错误","未识别到有效歌词"); return
-            self.maker_timestamps = []; self.maker_step = 0; self.is_maker_active = True; self.txt_maker.setReadOnly(True)
+            self.maker_timestamps = []; self.maker_step = 0; self.is_maker_active = True; self.txt_maker.setReadOnly(True); self.slider.set_markers(())
             self.player.play(); self.btn_play.setText("⏸"); self.btn_play.start_breathing(); self.vinyl.play()
             self.btn_rec.setText("⏹ 停止 / Backspace 回退"); self.btn_rec.start_breathing(); self.render_maker_html(); self.setFocus()
         else:
-            self.is_maker_active = False; self.txt_maker.setReadOnly(False); self.btn_rec.setText("🎙️ 开始录制"); self.btn_rec.stop_breathing()
+            self.is_maker_active = False; self.txt_maker.setReadOnly(False); self.btn_rec.setText("🎙️ 开始录制"); self.btn_rec.stop_breathing(); self.slider.set_markers(())
             self.lbl_maker_hint.setText("录制结束"); self.txt_maker.setPlainText("\n".join(self.maker_raw_lines))
+            self.txt_maker.document().setUndoRedoEnabled(True)
+
+    def build_maker_formats(self):
+        # 各状态的 (段落格式, 字符格式, 前缀), 与原先 HTML 样式一致
+        def fmt(color, px, bold=False, italic=False, strike=False, bg=None):
+            bf = QTextBlockFormat(); bf.setLineHeight(200, QTextBlockFormat.LineHeightTypes.ProportionalHeight.value)
+            if bg: bf.setBackground(bg)
+            else: bf.clearBackground()
+            cf = QTextCharFormat(); cf.setForeground(QColor(color)); cf.setProperty(QTextFormat.Property.FontPixelSize, px)
+            cf.setFontWeight(QFont.Weight.Bold if bold else QFont.Weight.Normal); cf.setFontItalic(italic); cf.setFontStrikeOut(strike)
+            return bf, cf
+        return {
+            'skip': fmt("#555", 14, italic=True) + ("",),
+            'done': fmt("#00AA88", 18, strike=True) + ("✅ ",),
+            'current': fmt(ACCENT_HEX, 24, bold=True, bg=QColor(0, 255, 213, 38)) + ("👉 ",),
+            'pending': fmt("#DDD", 18) + ("",),
+        }
+
+    def maker_state(self, p): return 'done' if p < self.maker_step else ('current' if p == self.maker_step else 'pending')
 
     def render_maker_html(self):
-        html = "<body style='font-family:Microsoft YaHei; font-size:18px; line-height:200%; color:#888;'>"
+        # 录制开始时整篇只构建一次; 之后每次按键只重设相关两行的格式 (restyle_maker_line)
+        if self.maker_formats is None: self.maker_formats = self.build_maker_formats()
+        doc = self.txt_maker.document(); doc.setUndoRedoEnabled(False); doc.clear()
+        cursor = QTextCursor(doc); cursor.beginEditBlock()
+        for i, l in enumerate(self.maker_raw_lines):
+            p = self.maker_line_pos[i]
+            bf, cf, prefix = self.maker_formats['skip' if p == -1 else self.maker_state(p)]
+            if i: cursor.insertBlock(bf, cf)
+            else: cursor.setBlockFormat(bf); cursor.setBlockCharFormat(cf)
+            cursor.insertText(prefix + (l.strip() or " "), cf)
+        cursor.endEditBlock()
+        self.focus_maker_line()
+
+    def restyle_maker_line(self, p):
+        if not 0 <= p < len(self.playable_indices): return
+        i = self.playable_indices[p]; bf, cf, prefix = self.maker_formats[self.maker_state(p)]
+        cursor = QTextCursor(self.txt_maker.document().findBlockByNumber(i)); cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(prefix + (self.maker_raw_lines[i].strip() or " "), cf); cursor.setBlockFormat(bf)
+        cursor.endEditBlock()
+
+    def focus_maker_line(self):
         t_idx = -1
         if self.maker_step < len(self.playable_indices): t_idx = self.playable_indices[self.maker_step]
-        for i, l in enumerate(self.maker_raw_lines):
-            c = l.strip() if l.strip() else "&nbsp;"; style = ""; prefix = ""
-            if self.is_skippable(l): style = "color:#555; font-style:italic; font-size:14px;"
-            elif i in self.playable_indices:
-                p = self.playable_indices.index(i)
-                if p < self.maker_step: style = "color:#00AA88; text-decoration:line-through;"; prefix="✅ "
-                elif p == self.maker_step: style = f"color:{ACCENT_HEX}; font-size:24px; font-weight:bold; background-color:rgba(0,255,213,0.15);"; prefix="👉 "
-                else: style = "color:#DDD;"
-            html += f"<div style='{style}'>{prefix}{c}</div>"
-        html += "</body>"; self.txt_maker.setHtml(html)
         if t_idx != -1:
-            cursor = self.txt_maker.textCursor(); cursor.movePosition(QTextCursor.MoveOperation.Start); cursor.movePosition(QTextCursor.MoveOperation.NextBlock, n=t_idx)
+            cursor = QTextCursor(self.txt_maker.document().findBlockByNumber(t_idx))
             self.txt_maker.setTextCursor(cursor)
             scrollbar = self.txt_maker.verticalScrollBar()
             rect = self.txt_maker.cursorRect(cursor)
@@ -476,15 +1595,37 @@ class ModernPlayer(QMainWindow):
             self.lbl_maker_hint.setText(f"正在录制: {self.maker_raw_lines[t_idx]}")
         elif self.maker_step >= len(self.playable_indices): self.lbl_maker_hint.setText("录制完成！等待结束...")
 
+    def queue_maker_update(self, *positions):
+        # 界面刷新推迟到事件处理完之后, 连续按键时不会因为重绘而推迟后面按键的时间戳
+        self.maker_dirty.update(positions)
+        if not self.maker_flush_pending: self.maker_flush_pending = True; QTimer.singleShot(0, self.flush_maker_update)
+
+    def flush_maker_update(self):
+        self.maker_flush_pending = False
+        if self.is_maker_active:
+            for p in sorted(self.maker_dirty): self.restyle_maker_line(p)
+            self.focus_maker_line(); self.slider.set_markers(self.maker_timestamps)
+            if self.maker_rewound: self.lbl_maker_hint.setText("⏪ 已回退 3秒，请重录上一句")
+        self.maker_dirty.clear(); self.maker_rewound = False
+
     def keyPressEvent(self, event):
         if self.is_maker_active:
             if event.key() == Qt.Key.Key_Space:
-                if self.maker_step < len(self.playable_indices): self.maker_timestamps.append(self.player.position()); self.maker_step += 1; self.render_maker_html()
+                # 事件到达时立即记录时间戳, 渲染放到之后
+                if self.maker_step < len(self.playable_indices):
+                    self.maker_timestamps.append(self.player.position()); self.maker_step += 1
+                    self.queue_maker_update(self.maker_step - 1, self.maker_step)
             elif event.key() == Qt.Key.Key_Backspace:
-                if self.maker_step > 0: self.maker_step -= 1; self.maker_timestamps.pop(); self.player.setPosition(max(0, self.player.position()-3000)); self.render_maker_html(); self.lbl_maker_hint.setText("⏪ 已回退 3秒，请重录上一句")
+                if self.maker_step > 0:
+                    self.maker_step -= 1; self.maker_timestamps.pop(); self.player.setPosition(max(0, self.player.position()-3000))
+                    self.maker_rewound = True; self.queue_maker_update(self.maker_step, self.maker_step + 1)
         else: super().keyPressEvent(event)
 
     def handle_media_status(self, s):
+        # 恢复上次的播放位置: 要等媒体加载完 setPosition 才生效
+        if self.resume_at and s in (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia):
+            path, pos = self.resume_at; self.resume_at = None
+            if path == self.player.current_path: self.player.setPosition(pos)
         if s == QMediaPlayer.MediaStatus.EndOfMedia:
             if self.is_maker_active: self.finish_recording_flow()
             elif self.play_mode == 1:
@@ -504,7 +1645,9 @@ class ModernPlayer(QMainWindow):
         try:
             with open(p,'w',encoding='utf-8') as f:
                 for i in range(min(len(self.maker_timestamps), len(self.playable_indices))):
-                    f.write(f"[{self.maker_timestamps[i]//60000:02}:{(self.maker_timestamps[i]%60000)/1000:05.2f}]{self.maker_raw_lines[self.playable_indices[i]]}\n")
+                    f.write(f"{format_time(self.maker_timestamps[i])}{self.maker_raw_lines[self.playable_indices[i]]}\n")
+            self.lyric_loader.cache.invalidate(p)
+            if self.search_active: self.search.set(self.playlist[self.current_index], 'lrc', tokenize(" ".join(self.maker_raw_lines[i] for i in self.playable_indices)))
             QMessageBox.information(self,"成功",f"已保存: {p}")
             self.load_lrc_view(self.playlist[self.current_index])
             self.stack.setCurrentIndex(0); self.btn_switch_mode.setText("🛠️ 进入歌词工坊")
@@ -515,10 +1658,74 @@ class ModernPlayer(QMainWindow):
     def prev_song(self): self.skip(-1)
     def skip(self,d):
         if not self.playlist: return
-        if self.play_mode==2: self.current_index=random.randint(0,len(self.playlist)-1)
-        else: self.current_index=(self.current_index+d)%len(self.playlist)
-        self.track_list.setCurrentRow(self.current_index); self.play_music(self.playlist[self.current_index])
+        row = self.queue.next() if d==1 else self.queue.prev()
+        if row == -1: return
+        self.select_row(row); self.play_music(self.playlist[row])
+
+    # --- 播放队列: 随机顺序 / 历史 / 下一首播放 (见 playqueue.py), 会话保存在 queue.json ---
+    # 当前行号存在队列里; 直接赋值只用于列表变化后的行号修正, 点播 / 切歌走 self.queue
+    @property
+    def current_index(self): return self.queue.cur
+    @current_index.setter
+    def current_index(self, row): self.queue.cur = row
+
+    def show_track_menu(self, view, pos):
+        idx = view.indexAt(pos)
+        if not idx.isValid(): return
+        row = self.result_model.rows[idx.row()] if view is self.result_list else idx.row()
+        menu = QMenu(self); menu.addAction("⏭ 下一首播放", lambda: self.play_next([row]))
+        menu.exec(view.viewport().mapToGlobal(pos))
+
+    def play_next(self, rows):
+        rows = [r for r in rows if 0 <= r < len(self.playlist)]
+        if not rows: return
+        self.queue.play_next(rows); self.lbl_scan.setText(f"⏭ 下一首: {self.playlist.name(rows[0])}")
+        if self.current_index != -1: self.prefetch_next(); self.save_queue()
+
+    def queue_state(self):
+        store = self.playlist; cur = self.current_index
+        return {"current": store[cur] if 0 <= cur < len(store) else None, "history": [store[r] for r in self.queue.history()],
+                "upnext": [store[r] for r in self.queue.upnext]}
+
+    def restore_queue(self, state):
+        # 按路径恢复 (行号可能已变); 当前曲目不在列表里时返回 False
+        find = self.playlist.index_of; cur = find(state["current"]) if state.get("current") else -1
+        if cur == -1: return False
+        self.queue.restore(cur, [r for r in map(find, state.get("history", ())) if r != -1], [r for r in map(find, state.get("upnext", ())) if r != -1])
+        return True
+
+    def read_queue(self):
+        try:
+            with open(QUEUE_FILE, 'r', encoding='utf-8') as f: state = json.load(f)
+        except (OSError, ValueError): return None
+        return state if isinstance(state, dict) else None
+
+    def save_queue(self):
+        # 换歌 / 改动下一首播放 / 退出时写入; 还没恢复到上次位置时保存的仍是上次的位置
+        if self.current_index == -1 or self.player is None: return
+        state = self.queue_state(); at = self.resume_at; tmp = QUEUE_FILE + ".tmp"
+        state["position"] = at[1] if at and at[0] == state["current"] else self.player.position()
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f: json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp, QUEUE_FILE)
+        except OSError: pass
+
+    def resume_session(self):
+        # 列表第一次填充时恢复上次的会话 (曲目 / 播放位置 / 随机历史 / 下一首播放), 否则从第一首开始
+        state, self.resume_state = self.resume_state, None
+        if state and self.restore_queue(state):
+            pos = int(state.get("position") or 0)
+            if pos > 0: self.resume_at = (state["current"], pos)
+            return self.current_index
+        self.queue.jump(0); return 0
 
 if __name__ == "__main__":
-    try: app = QApplication(sys.argv); win = ModernPlayer(); win.show(); sys.exit(app.exec())
+    try:
+        app = QApplication(sys.argv); win = ModernPlayer()
+        if instance.enabled():
+            server = instance.InstanceServer(win)
+            # 两个进程几乎同时启动时, 后启动的在这里才发现对方
+            if not server.listen() and instance.forward(sys.argv[1:]): sys.exit(0)
+            server.received.connect(win.on_remote)
+        win.on_remote(instance.parse_args(sys.argv[1:])); win.show(); sys.exit(app.exec())
     except: pass
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque
+
+from PyQt6.QtCore import Qt, QTimer, QElapsedTimer
+from PyQt6.QtWidgets import QLabel
+
+# --- 性能采集 ---
+# 默认关闭, 关闭时被 @timed 包装的函数只多一次属性判断.
+# 打开方式: 环境变量 MUSE_PERF=1, 或运行中按 Ctrl+Shift+P; Ctrl+Shift+D 导出.
+class Profiler:
+    HISTORY = 512; TRACE_CAPACITY = 200000; PROBE_MS = 50
+
+    def __init__(self):
+        self.enabled = False; self.lock = threading.Lock()
+        self.stats = {}; self.trace = deque(maxlen=self.TRACE_CAPACITY)
+        self.origin = time.perf_counter(); self.probe = None
+
+    def record(self, name, start, dur):
+        # start/dur 为 perf_counter 秒数
+        with self.lock:
+            h = self.stats.get(name)
+            if h is None: h = self.stats[name] = deque(maxlen=self.HISTORY)
+            h.append(dur * 1000); self.trace.append((name, start, dur, threading.get_ident()))
+
+    def sample(self, name, ms):
+        # 直接记录一个毫秒值 (延迟 / 抖动这类没有起止区间的数据)
+        with self.lock:
+            h = self.stats.get(name)
+            if h is None: h = self.stats[name] = deque(maxlen=self.HISTORY)
+            h.append(ms)
+
+    def set_enabled(self, on):
+        self.enabled = on
+        if on and self.probe is None:
+            # 事件循环延迟: 定时器实际触发时间比预期晚了多少
+            self.probe = QTimer(); self.probe.setTimerType(Qt.TimerType.PreciseTimer); self.probe.timeout.connect(self.on_probe)
+            self.probe_clock = QElapsedTimer()
+        if on: self.probe_clock.start(); self.probe.start(self.PROBE_MS)
+        elif self.probe is not None: self.probe.stop()
+
+    def on_probe(self):
+        late = self.probe_clock.restart() - self.PROBE_MS
+        self.sample("loop.latency", max(0, late))
+
+    def summary(self):
+        out = {}
+        with self.lock: items = [(k, sorted(v)) for k, v in self.stats.items()]
+        for k, v in items:
+            if not v: continue
+            out[k] = {"n": len(v), "mean": sum(v) / len(v), "p50": v[len(v)//2], "p95": v[min(len(v)-1, int(len(v) * 0.95))], "max": v[-1]}
+        return out
+
+    def dump_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f: json.dump(self.summary(), f, indent=2)
+
+    def dump_chrome_trace(self, path):
+        # chrome://tracing / Perfetto 可直接打开
+        with self.lock: events = list(self.trace)
+        pid = os.getpid()
+        data = {"displayTimeUnit": "ms", "traceEvents": [
+            {"name": n, "cat": n.split(".")[0], "ph": "X", "ts": (s - self.origin) * 1e6, "dur": d * 1e6, "pid": pid, "tid": tid}
+            for n, s, d, tid in events]}
+        with open(path, 'w', encoding='utf-8') as f: json.dump(data, f)
+
+PERF = Profiler()
+
+def timed(name):
+    # 只用于参数固定的方法 (paintEvent / 槽函数等)
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not PERF.enabled: return fn(*args, **kwargs)
+            t = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: PERF.record(name, t, time.perf_counter() - t)
+        return wrapper
+    return deco
+
+# --- 屏幕叠加层 ---
+class PerfOverlay(QLabel):
+    REFRESH_MS = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0,0,0,0.75); color: #0F0; font-family: Consolas, monospace; font-size: 11px; padding: 6px; border-radius: 6px;")
+        self.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
+        self.timer = QTimer(self); self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_active(self, on):
+        if on: self.refresh(); self.show(); self.raise_(); self.timer.start(self.REFRESH_MS)
+        else: self.timer.stop(); self.hide()
+
+    def refresh(self):
+        rows = [f"{'metric':24} {'mean':>7} {'p95':>7} {'max':>7}"]
+        for k, v in sorted(PERF.summary().items()):
+            rows.append(f"{k[:24]:24} {v['mean']:7.2f} {v['p95']:7.2f} {v['max']:7.2f}")
+        self.setText("\n".join(rows)); self.adjustSize()
+        p = self.parentWidget()
+        if p is not None: self.move(p.width() - self.width() - 12, 45)
@@ -0,0 +1,135 @@
+import random
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+# --- 播放队列 ---
+# 以行号 (TrackStore 下标) 表示. 随机模式用惰性 Fisher-Yates: perm 始终是全部行号的一个排列,
+# perm[:drawn] 是本轮已经抽出的顺序 (即随机播放的历史, pos 指向当前曲目), 其余是还没抽到的池子, 顺序无关;
+# 下一首时从池子里随机换一首到 drawn 处, O(1), 一轮之内每首只出现一次. 重新洗牌只需把 drawn 归位, 也是 O(1).
+# where 是 perm 的逆 (行号 -> 位置), 点播时 O(1) 找到曲目. upnext: "下一首播放" 插入的行号, 优先于其他顺序.
+# 排列在第一次进入随机模式时才建立; 行号随列表增删/排序由调用方同步 (extend_to / remove / reorder)
+class PlayQueue:
+    HISTORY = 200    # history() 默认最多返回的条数 (用于保存会话)
+
+    def __init__(self):
+        self.shuffle = False; self.reset(0)
+
+    def reset(self, n=0):
+        self.n = n; self.cur = -1; self.perm = None; self.where = None; self.pos = -1; self.drawn = 0; self.upnext = deque(); self.pending = None
+
+    def __len__(self): return self.n
+
+    def build_perm(self):
+        self.perm = array('I', range(self.n)); self.where = array('I', self.perm); self.pos = -1; self.drawn = 0; self.pending = None
+
+    def ensure_perm(self):
+        if self.perm is None: self.build_perm(); self.start_cycle()
+
+    def swap(self, i, j):
+        perm = self.perm; a = perm[i]; b = perm[j]
+        perm[i] = b; perm[j] = a; self.where[a] = j; self.where[b] = i
+
+    def start_cycle(self):
+        # 新一轮: 当前曲目放在最前面, 其余全部回到池子里
+        self.pos = -1; self.drawn = 0; self.pending = None
+        if self.cur != -1: self.swap(self.where[self.cur], 0); self.pos = 0; self.drawn = 1
+
+    def draw(self):
+        self.swap(random.randrange(self.drawn, self.n), self.drawn); self.drawn += 1
+
+    def set_shuffle(self, on):
+        self.shuffle = on
+        if on:
+            if self.perm is None: self.build_perm()
+            self.start_cycle()
+
+    # --- 导航 ---
+    def peek(self):
+        # 下一首的行号, 不移动; 随机模式下会先抽好, 之后的 next() 返回同一首 (供预取使用)
+        if self.upnext: return self.upnext[0]
+        if not self.n: return -1
+        if not self.shuffle: return (self.cur + 1) % self.n
+        if self.n == 1: return 0
+        self.ensure_perm()
+        if self.pos + 1 < self.drawn: return self.perm[self.pos + 1]
+        if self.drawn < self.n: self.draw(); return self.perm[self.pos + 1]
+        # 本轮已全部放完: 先选好下一轮的第一首 (不与当前重复), 真正切过去时才开始新一轮, 在这之前仍可以后退
+        if self.pending is None:
+            k = random.randrange(self.n - (self.cur != -1)); self.pending = k + (self.cur != -1 and k >= self.cur)
+        return self.pending
+
+    def next(self):
+        if self.upnext: row = self.upnext.popleft(); self.jump(row); return row
+        row = self.peek()
+        if row != -1:
+            if self.shuffle and self.n > 1:
+                if self.pos + 1 >= self.drawn: self.start_cycle(); self.swap(self.where[row], self.drawn); self.drawn += 1
+                self.pos += 1
+            self.cur = row
+        return row
+
+    def prev(self):
+        if not self.n: return -1
+        if not self.shuffle: self.cur = (self.cur - 1) % self.n
+        elif self.perm is not None and self.pos > 0: self.pos -= 1; self.cur = self.perm[self.pos]
+        # 随机模式下已经是本轮第一首时重播当前曲目
+        return self.cur
+
+    def jump(self, row):
+        # 点播: 随机模式下记入历史 (之后向前的历史作废, 回到池子里), 接下来仍从池子里随机
+        self.cur = row; self.pending = None
+        if not self.shuffle or row < 0: return
+        self.ensure_perm(); k = self.where[row]
+        if k <= self.pos: self.pos = k
+        else: self.pos += 1; self.swap(k, self.pos)
+        self.drawn = self.pos + 1
+
+    def play_next(self, rows):
+        # 插到待播最前面, 按给定顺序播放
+        self.upnext.extendleft(reversed(list(rows)))
+
+    # --- 行号同步 ---
+    def extend_to(self, n):
+        # 列表末尾追加了行: 新行进入随机池
+        old = self.n; self.n = n; self.pending = None
+        if self.perm is not None and n > old: self.perm.extend(range(old, n)); self.where.extend(range(old, n))
+
+    def remove(self, rows):
+        # rows: 升序的被删行号, 其后的行号前移. O(n)
+        if not rows: return
+        dead = set(rows); shift = lambda r: r - bisect_left(rows, r)
+        if self.cur != -1: self.cur = -1 if self.cur in dead else shift(self.cur)
+        self.upnext = deque(shift(r) for r in self.upnext if r not in dead)
+        self.n -= len(dead); self.pending = None
+        if self.perm is None: return
+        perm = self.perm
+        self.pos -= sum(1 for k in range(self.pos + 1) if perm[k] in dead)
+        self.drawn -= sum(1 for k in range(self.drawn) if perm[k] in dead)
+        self.perm = array('I', (shift(r) for r in perm if r not in dead))
+        self.where = array('I', bytes(4 * len(self.perm)))
+        for k, r in enumerate(self.perm): self.where[r] = k
+
+    def reorder(self, order):
+        # 排序后新的第 i 行是原来的第 order[i] 行; 播放历史和随机池保持不变
+        inv = array('I', bytes(4 * len(order)))
+        for i, r in enumerate(order): inv[r] = i
+        if self.cur != -1: self.cur = inv[self.cur]
+        self.upnext = deque(inv[r] for r in self.upnext)
+        if self.pending is not None: self.pending = inv[self.pending]
+        if self.perm is not None:
+            where = self.where
+            self.where = array('I', (where[r] for r in order)); self.perm = array('I', (inv[r] for r in self.perm))
+
+    # --- 会话保存 / 恢复 (行号由调用方与路径互转) ---
+    def history(self, limit=HISTORY):
+        # 随机模式下本轮截至当前曲目的播放顺序
+        if not self.shuffle or self.perm is None or self.pos < 0: return []
+        return self.perm[max(0, self.pos + 1 - limit):self.pos + 1].tolist()
+
+    def restore(self, cur, history=(), upnext=()):
+        self.cur = cur; self.upnext = deque(upnext)
+        if not self.shuffle: return
+        self.build_perm()
+        for i, r in enumerate(dict.fromkeys(history)): self.swap(self.where[r], i); self.pos = i; self.drawn = i + 1
+        if cur != -1 and (self.pos < 0 or self.perm[self.pos] != cur): self.jump(cur)
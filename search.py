@@ -0,0 +1,108 @@
+import re
+from bisect import bisect_left, insort
+
+# --- 分词 ---
+# 拉丁字母/数字按词切分, 支持前缀匹配; 中日韩文字没有空格, 按 单字 + 相邻两字 建索引,
+# 查询时把连续的中文拆成相邻两字逐个求交, 相当于子串匹配
+CJK = "[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff66-\uff9f]"
+RUN = re.compile(f"({CJK}+)|((?:(?!{CJK})[^\\W_])+)")
+SHORT = 2          # 长度不超过 SHORT 的前缀直接建倒排, 输入一两个字母时不必遍历词表
+PREFIX = "\x01"    # 前缀条目的键标记, 与普通词区分
+
+def split_runs(text):
+    # 返回 [(是否中文, 片段)]
+    return [(True, c) if c else (False, w) for c, w in RUN.findall(text.casefold())]
+
+def tokenize(text):
+    tokens = set()
+    for cjk, run in split_runs(text):
+        if cjk:
+            tokens.update(run)
+            tokens.update(run[i:i+2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+            tokens.update(PREFIX + run[:k] for k in range(1, min(SHORT, len(run)) + 1))
+    return tokens
+
+# --- 倒排索引 ---
+# 以路径为文档键 (与播放列表顺序无关, 排序/重排不需要重建); 每个文档分字段 (name / lrc) 记录词,
+# 更新某个字段时只增删有变化的词. 文档的词存成 ((字段, (词, ...)), ...) 元组,
+# 只含字符串的元组不被垃圾回收器跟踪, 十万首歌时也不会拖慢完整回收
+class SearchIndex:
+    def __init__(self): self.clear()
+
+    def clear(self):
+        self.ids = {}; self.paths = []; self.fields = []; self.free = []
+        self.postings = {}; self.vocab = []   # vocab: 长度超过 SHORT 的拉丁词, 有序, 用于前缀区间查找
+
+    def __len__(self): return len(self.ids)
+    def __contains__(self, path): return path in self.ids
+
+    def set(self, path, field, tokens):
+        i = self.ids.get(path)
+        if i is None:
+            if self.free: i = self.free.pop(); self.paths[i] = path; self.fields[i] = ()
+            else: i = len(self.paths); self.paths.append(path); self.fields.append(())
+            self.ids[path] = i
+        f = self.fields[i]
+        if not f:
+            # 新文档: 不需要比较新旧词集合
+            if tokens:
+                self.fields[i] = ((field, tuple(tokens)),)
+                for t in tokens: self.post(t, i)
+            return
+        old = self.doc_tokens(f)
+        f = tuple(kv for kv in f if kv[0] != field)
+        if tokens: f += ((field, tuple(tokens)),)
+        self.fields[i] = f; new = self.doc_tokens(f)
+        for t in old - new: self.unpost(t, i)
+        for t in new - old: self.post(t, i)
+
+    def remove(self, path):
+        i = self.ids.pop(path, None)
+        if i is None: return
+        for t in self.doc_tokens(self.fields[i]): self.unpost(t, i)
+        self.paths[i] = None; self.fields[i] = None; self.free.append(i)
+
+    def doc_tokens(self, f):
+        return set().union(*(tokens for _, tokens in f))
+
+    def post(self, t, i):
+        s = self.postings.get(t)
+        if s is not None: s.add(i); return
+        self.postings[t] = {i}
+        if len(t) > SHORT and t[0] != PREFIX: insort(self.vocab, t)
+
+    def unpost(self, t, i):
+        s = self.postings.get(t)
+        if s is None: return
+        s.discard(i)
+        if not s:
+            del self.postings[t]
+            if len(t) > SHORT and t[0] != PREFIX:
+                k = bisect_left(self.vocab, t)
+                if k < len(self.vocab) and self.vocab[k] == t: del self.vocab[k]
+
+    def term_docs(self, cjk, run):
+        if cjk:
+            # 单字直接查; 多个字时所有相邻两字都要出现
+            keys = [run] if len(run) == 1 else [run[i:i+2] for i in range(len(run) - 1)]
+            sets = sorted((self.postings.get(k, ()) for k in keys), key=len)
+            return set(sets[0]).intersection(*sets[1:]) if sets[0] else set()
+        if len(run) <= SHORT: return self.postings.get(PREFIX + run, set())
+        # 词表里以 run 开头的连续区间
+        out = set(); vocab = self.vocab; k = bisect_left(vocab, run)
+        while k < len(vocab) and vocab[k].startswith(run): out |= self.postings[vocab[k]]; k += 1
+        return out
+
+    def search(self, text):
+        # 所有词都要命中 (任一字段); 返回路径集合, 空查询返回 None
+        runs = split_runs(text)
+        if not runs: return None
+        result = None
+        # 较长的片段区分度高, 先算它们, 后面求交的集合更小
+        for cjk, run in sorted(runs, key=lambda r: -len(r[1])):
+            docs = self.term_docs(cjk, run)
+            result = set(docs) if result is None else result & docs
+            if not result: return set()
+        return {self.paths[i] for i in result}
@@ -0,0 +1,119 @@
+import os
+import hashlib
+
+from PyQt6.QtCore import QThread, QUrl, pyqtSignal
+
+# 波形/频谱都需要 NumPy; 没装时不显示
+try: import numpy as np
+except ImportError: np = None
+
+# --- 采样转换 ---
+PEAKS = 1000         # 每首歌的波形列数 (每列 1 字节, 0-255)
+BLOCK = 512          # 解码时先按 512 帧取一次峰值, 结束后再合并成 PEAKS 列
+PEAK_DIR = "peaks"
+
+# QtMultimedia 只在用到时导入, 不拖慢主窗口启动
+def mono_float_format():
+    from PyQt6.QtMultimedia import QAudioFormat
+    fmt = QAudioFormat(); fmt.setSampleFormat(QAudioFormat.SampleFormat.Float); fmt.setChannelCount(1); fmt.setSampleRate(44100)
+    return fmt
+
+def buffer_to_array(buf):
+    # QAudioBuffer -> 单声道 float32 (-1..1); 后端没按要求转换格式时自己转
+    from PyQt6.QtMultimedia import QAudioFormat
+    fmt = buf.format(); n = buf.byteCount(); ch = max(1, fmt.channelCount())
+    if n <= 0: return np.zeros(0, np.float32)
+    raw = buf.constData().asstring(n); sf = fmt.sampleFormat()
+    if sf == QAudioFormat.SampleFormat.Float: a = np.frombuffer(raw, np.float32)
+    elif sf == QAudioFormat.SampleFormat.Int16: a = np.frombuffer(raw, np.int16) / 32768.0
+    elif sf == QAudioFormat.SampleFormat.Int32: a = np.frombuffer(raw, np.int32) / 2147483648.0
+    elif sf == QAudioFormat.SampleFormat.UInt8: a = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128.0
+    else: return np.zeros(0, np.float32)
+    a = a[:len(a) // ch * ch]
+    return (a.reshape(-1, ch).mean(axis=1) if ch > 1 else a).astype(np.float32, copy=False)
+
+def block_peaks(samples):
+    # 每 BLOCK 个采样取一次绝对值峰值, 末尾不足一块的也算一块
+    if not len(samples): return np.zeros(0, np.float32)
+    a = np.abs(samples); k = len(a) // BLOCK * BLOCK
+    out = a[:k].reshape(-1, BLOCK).max(axis=1) if k else np.zeros(0, np.float32)
+    return np.append(out, a[k:].max()) if k < len(a) else out
+
+def reduce_peaks(env, columns=PEAKS):
+    # 合并成固定列数并归一化到 0-255
+    if not len(env): return b""
+    if len(env) >= columns:
+        edges = np.linspace(0, len(env), columns + 1).astype(np.int64)[:-1]
+        cols = np.maximum.reduceat(env, edges)
+    else: cols = np.interp(np.linspace(0, len(env) - 1, columns), np.arange(len(env)), env)
+    top = cols.max()
+    return (cols / top * 255).astype(np.uint8).tobytes() if top > 0 else bytes(columns)
+
+# --- 峰值缓存 ---
+# peaks/ 下每首歌一个 PEAKS 字节的文件, 按 路径 + mtime 命名; 再次打开时直接读取
+class PeakCache:
+    def __init__(self, peak_dir=PEAK_DIR): self.peak_dir = peak_dir
+
+    def path_for(self, track_path):
+        try: mtime = os.stat(track_path).st_mtime_ns
+        except OSError: return None
+        return os.path.join(self.peak_dir, hashlib.sha1(f"{track_path}|{mtime}".encode('utf-8')).hexdigest() + ".bin")
+
+    def read(self, track_path):
+        p = self.path_for(track_path)
+        try:
+            with open(p, 'rb') as f: data = f.read()
+        except (OSError, TypeError): return None
+        return data if len(data) == PEAKS else None
+
+    def write(self, track_path, peaks):
+        p = self.path_for(track_path)
+        if p is None or len(peaks) != PEAKS: return
+        tmp = p + ".tmp"
+        try:
+            os.makedirs(self.peak_dir, exist_ok=True)
+            with open(tmp, 'wb') as f: f.write(peaks)
+            os.replace(tmp, p)
+        except OSError: pass
+
+# --- 后台解码 ---
+class WaveformLoader(QThread):
+    # 在自己的线程里跑 QAudioDecoder (需要事件循环), 边解码边取块峰值, 不保留整首歌的采样
+    peaks_ready = pyqtSignal(str, bytes)
+
+    def __init__(self, path, cache, parent=None):
+        super().__init__(parent)
+        self.path = path; self.cache = cache; self.cancelled = False
+
+    def cancel(self): self.cancelled = True; self.quit()
+
+    def run(self):
+        if np is None: return
+        from PyQt6.QtMultimedia import QAudioDecoder
+        self.blocks = []
+        dec = QAudioDecoder(); dec.setAudioFormat(mono_float_format()); dec.setSource(QUrl.fromLocalFile(self.path))
+        # 用 lambda 直接在解码线程里调用 (QThread 对象本身属于主线程, 直接连槽会排队到主线程)
+        dec.bufferReady.connect(lambda: self.on_buffer(dec)); dec.finished.connect(lambda: self.quit()); dec.error.connect(lambda *_: self.quit())
+        dec.start(); self.exec(); dec.stop()
+        if self.cancelled or not self.blocks: return
+        peaks = reduce_peaks(np.concatenate(self.blocks))
+        self.cache.write(self.path, peaks)
+        self.peaks_ready.emit(self.path, peaks)
+
+    def on_buffer(self, dec):
+        if self.cancelled: dec.stop(); self.quit(); return
+        while dec.bufferAvailable(): self.blocks.append(block_peaks(buffer_to_array(dec.read())))
+
+# --- 频谱 ---
+BANDS = 32; FFT_SIZE = 2048
+
+def spectrum_bands(samples, rate=44100, bands=BANDS):
+    # 最近 FFT_SIZE 个采样 -> 对数分布的 bands 个频段, 0..1 (约 60dB 动态范围)
+    if len(samples) < FFT_SIZE: samples = np.pad(samples, (FFT_SIZE - len(samples), 0))
+    x = samples[-FFT_SIZE:] * np.hanning(FFT_SIZE)
+    mag = np.abs(np.fft.rfft(x)) / (FFT_SIZE / 4)
+    freqs = np.fft.rfftfreq(FFT_SIZE, 1 / rate)
+    edges = np.geomspace(40, min(16000, rate / 2), bands + 1)
+    idx = np.clip(np.searchsorted(freqs, edges), 1, len(mag) - 1)
+    out = np.array([mag[a:max(b, a + 1)].max() for a, b in zip(idx[:-1], idx[1:])])
+    return np.clip((20 * np.log10(out + 1e-9) + 60) / 60, 0, 1)